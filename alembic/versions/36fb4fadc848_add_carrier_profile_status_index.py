@@ -0,0 +1,28 @@
+"""add carrier profile status index
+
+Revision ID: 36fb4fadc848
+Revises: 
+Create Date: 2026-10-17 19:20:38.374772
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36fb4fadc848'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_carrier_profiles_status_created_at",
+        "carrier_profiles",
+        ["status", "created_at", "user_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_carrier_profiles_status_created_at", table_name="carrier_profiles")
\ No newline at end of file
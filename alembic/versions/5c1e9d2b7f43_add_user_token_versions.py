@@ -0,0 +1,30 @@
+"""add user token versions
+
+Revision ID: 5c1e9d2b7f43
+Revises: a3241c46e0d0
+Create Date: 2026-10-17 20:02:41.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e9d2b7f43'
+down_revision = 'a3241c46e0d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_token_versions",
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.current_timestamp()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_token_versions")
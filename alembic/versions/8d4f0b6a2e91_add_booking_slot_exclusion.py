@@ -0,0 +1,45 @@
+"""add booking slot exclusion
+
+Reject overlapping PENDING/CONFIRMED bookings at a terminal in the database.
+Fails if such overlaps already exist; cancel or reject the duplicates first.
+
+Revision ID: 8d4f0b6a2e91
+Revises: 5c1e9d2b7f43
+Create Date: 2026-10-17 20:31:12.604519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f0b6a2e91'
+down_revision = '5c1e9d2b7f43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.add_column(
+        "bookings",
+        sa.Column(
+            "slot",
+            postgresql.TSRANGE(),
+            sa.Computed("tsrange(date + start_time, date + end_time, '[)')", persisted=True),
+        ),
+    )
+    op.create_exclude_constraint(
+        "ex_bookings_terminal_slot",
+        "bookings",
+        ("terminal_id", "="),
+        ("slot", "&&"),
+        using="gist",
+        where=sa.text("status IN ('PENDING', 'CONFIRMED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("ex_bookings_terminal_slot", "bookings")
+    op.drop_column("bookings", "slot")
@@ -0,0 +1,37 @@
+"""add booking claims
+
+Revision ID: b7a2c5e8d013
+Revises: 8d4f0b6a2e91
+Create Date: 2026-10-17 21:22:05.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7a2c5e8d013'
+down_revision = '8d4f0b6a2e91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "bookings",
+        sa.Column("claimed_by_operator_user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id")),
+    )
+    op.add_column("bookings", sa.Column("claimed_until", sa.DateTime()))
+    op.create_index(
+        "ix_bookings_pending_queue",
+        "bookings",
+        ["terminal_id", "date", "start_time", "id"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_pending_queue", table_name="bookings")
+    op.drop_column("bookings", "claimed_until")
+    op.drop_column("bookings", "claimed_by_operator_user_id")
@@ -0,0 +1,28 @@
+"""add driver plate index
+
+Revision ID: e3f9a1c6d5b2
+Revises: b7a2c5e8d013
+Create Date: 2026-10-17 22:41:37.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f9a1c6d5b2'
+down_revision = 'b7a2c5e8d013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_driver_profiles_plate_key",
+        "driver_profiles",
+        [sa.text("upper(regexp_replace(truck_plate, '[^[:alnum:]]', '', 'g'))")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_driver_profiles_plate_key", table_name="driver_profiles")
@@ -0,0 +1,55 @@
+"""add booking listing indexes
+
+Revision ID: f6b8d2e4a7c1
+Revises: e3f9a1c6d5b2
+Create Date: 2026-10-17 23:12:48.551360
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d2e4a7c1'
+down_revision = 'e3f9a1c6d5b2'
+branch_labels = None
+depends_on = None
+
+
+# Single-column indexes superseded by the composites that lead with the same column
+SUPERSEDED = {
+    "ix_bookings_carrier_user_id": ["carrier_user_id"],
+    "ix_bookings_driver_user_id": ["driver_user_id"],
+    "ix_bookings_terminal_id": ["terminal_id"],
+    "ix_bookings_date": ["date"],
+}
+
+COMPOSITES = {
+    "ix_bookings_terminal_date": ["terminal_id", "date", "start_time", "id"],
+    "ix_bookings_terminal_status_date": ["terminal_id", "status", "date", "start_time", "id"],
+    "ix_bookings_carrier_date": ["carrier_user_id", "date", "start_time", "id"],
+    "ix_bookings_carrier_status_date": ["carrier_user_id", "status", "date", "start_time", "id"],
+    "ix_bookings_driver_date": ["driver_user_id", "date", "start_time", "id"],
+    "ix_bookings_date_order": ["date", "start_time", "id"],
+}
+
+
+def upgrade() -> None:
+    for name, columns in COMPOSITES.items():
+        op.create_index(name, "bookings", columns)
+    op.create_index(
+        "ix_bookings_carrier_unassigned",
+        "bookings",
+        ["carrier_user_id", "date", "start_time", "id"],
+        postgresql_where=sa.text("status = 'CONFIRMED' AND driver_user_id IS NULL"),
+    )
+    for name in SUPERSEDED:
+        op.drop_index(name, table_name="bookings", if_exists=True)
+
+
+def downgrade() -> None:
+    for name, columns in SUPERSEDED.items():
+        op.create_index(name, "bookings", columns)
+    op.drop_index("ix_bookings_carrier_unassigned", table_name="bookings")
+    for name in COMPOSITES:
+        op.drop_index(name, table_name="bookings")
@@ -1,41 +1,104 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from ..core.database import get_sync_db
+from typing import List, Optional
+from uuid import UUID
+from ..core.config import settings
+from ..core.database import get_sync_db, get_async_db
 from ..core.security import decode_access_token
-from ..models.user import User
+from ..services.principals import Principal, get_principal, get_principal_async, principal_from_claims
+from ..services.token_versions import token_versions
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def get_current_user(db: Session = Depends(get_sync_db), token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _decode_token(token: str) -> dict:
     try:
         payload = decode_access_token(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        if payload.get("sub") is None:
+            raise _credentials_exception()
+        UUID(payload["sub"])
+        return payload
     except Exception:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+
+
+def _get_principal_from_claims(payload: dict) -> Optional[Principal]:
+    """Authorize from the token's signed claims when stateless auth is on.
+
+    Returns None when the principal has to be loaded from the database: the mode
+    is off, the token predates it, or this worker's version table is stale.
+    """
+    if not settings.STATELESS_AUTH or not token_versions.is_fresh():
+        return None
+    try:
+        principal = principal_from_claims(payload)
+    except (ValueError, TypeError):
+        raise _credentials_exception()
+    if principal is not None and principal.token_version < token_versions.get(principal.id):
+        raise _credentials_exception()
+    return principal
+
+
+def _check_principal(principal: Optional[Principal], payload: dict) -> Principal:
+    if principal is None:
+        raise _credentials_exception()
+    if payload.get("ver", principal.token_version) < principal.token_version:
+        raise _credentials_exception()
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Inactive user",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+
+def get_current_user(db: Session = Depends(get_sync_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    # Served from the token claims or the principal cache; the session only opens
+    # a connection when both miss
+    payload = _decode_token(token)
+    principal = _get_principal_from_claims(payload)
+    if principal is not None:
+        return principal
+    return _check_principal(get_principal(db, UUID(payload["sub"])), payload)
+
+
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> Principal:
+    payload = _decode_token(token)
+    principal = _get_principal_from_claims(payload)
+    if principal is not None:
+        return principal
+    return _check_principal(await get_principal_async(db, UUID(payload["sub"])), payload)
 
 
 def require_role(allowed_roles: List[str]):
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: Principal = Depends(get_current_user)):
+        if current_user.role.value not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Operation not permitted"
+            )
+        return current_user
+    return role_checker
+
+
+def require_role_async(allowed_roles: List[str]):
+    async def role_checker(current_user: Principal = Depends(get_current_user_async)):
         if current_user.role.value not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Operation not permitted"
             )
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
@@ -1,164 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from ....core.database import get_sync_db
+from ....core.config import settings
+from ....core.database import get_sync_db, get_pool_statistics
 from ....models.user import User, UserRole
 from ....models.terminal import Terminal, TerminalStatus
 from ....models.booking import Booking, BookingStatus
-from ....models.profile import OperatorProfile, CarrierProfile, DriverProfile
+from ....models.profile import OperatorProfile, CarrierProfile, DriverProfile, CarrierStatus
 from ....models.notification import Notification, NotificationType
 from ....schemas.user import UserResponse, UserListResponse, UserUpdate
 from ....schemas.terminal import TerminalResponse, TerminalCreate, TerminalUpdate, TerminalListResponse
-from ....schemas.booking import BookingResponse, BookingListResponse
+from ....schemas.booking import BookingResponse, BookingListResponse, BookingExportFormatEnum
 from ....schemas.carrier import CarrierListResponse, CarrierApprovalRequest
 from ....schemas.operator import OperatorProfileResponse
 from ....schemas.driver import DriverProfileResponse
 from ....api.deps import get_current_user, require_role
+from ....services.availability import availability_index
+from ....services.principals import Principal, invalidate_principal
+from ....services.token_versions import bump_token_version
+from ....services.profiles import CARRIER_ROW, USER_ROW, join_profiles, joined_profiles, serialize_user
+from ....services.bookings import BOOKING_PAGE_ORDER, BOOKING_ROW
+from ....services.booking_export import EXPORT_MEDIA_TYPES, export_bookings
+from ....services.terminals import TERMINAL_PAGE_ORDER, TERMINAL_ROW
+from ....utils.pagination import apply_date_filter, apply_keyset, build_page, parse_fields, split_page
 
 
 router = APIRouter()
 
+USER_PAGE_ORDER = (User.created_at, User.id)
+CARRIER_PAGE_ORDER = (CarrierProfile.created_at, CarrierProfile.user_id)
+
 
 @router.get("/users", response_model=UserListResponse)
-async def get_all_users(
+def get_all_users(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     role: Optional[UserRole] = None,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    fields: Optional[str] = None,  # Comma-separated UserResponse fields
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
-    query = db.query(User)
+    selected = parse_fields(fields, UserResponse)
+    query = db.query(USER_ROW.only(selected, USER_PAGE_ORDER))
+    if not selected or "profile" in selected:
+        query = join_profiles(query)
     
     if role:
         query = query.filter(User.role == role)
     
-    users = query.offset(skip).limit(limit).all()
-    user_responses = []
-    
-    for user in users:
-        profile_data = None
-        
-        if user.role == UserRole.OPERATOR:
-            profile = db.query(OperatorProfile).filter(OperatorProfile.user_id == user.id).first()
-            if profile:
-                profile_data = {
-                    "first_name": profile.first_name,
-                    "last_name": profile.last_name,
-                    "phone": profile.phone,
-                    "gender": profile.gender,
-                    "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                    "terminal_id": str(profile.terminal_id) if profile.terminal_id else None
-                }
-        elif user.role == UserRole.CARRIER:
-            profile = db.query(CarrierProfile).filter(CarrierProfile.user_id == user.id).first()
-            if profile:
-                profile_data = {
-                    "first_name": profile.first_name,
-                    "last_name": profile.last_name,
-                    "phone": profile.phone,
-                    "gender": profile.gender,
-                    "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                    "company_name": profile.company_name,
-                    "status": profile.status.value
-                }
-        elif user.role == UserRole.DRIVER:
-            profile = db.query(DriverProfile).filter(DriverProfile.user_id == user.id).first()
-            if profile:
-                profile_data = {
-                    "first_name": profile.first_name,
-                    "last_name": profile.last_name,
-                    "phone": profile.phone,
-                    "gender": profile.gender,
-                    "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                    "truck_number": profile.truck_number,
-                    "truck_plate": profile.truck_plate,
-                    "status": profile.status.value,
-                    "carrier_user_id": str(profile.carrier_user_id)
-                }
-        
-        user_responses.append({
-            "id": str(user.id),
-            "email": user.email,
-            "role": user.role.value,
-            "is_active": user.is_active,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at,
-            "profile": profile_data
-        })
-    
-    return UserListResponse(
-        status="success",
-        message="Users retrieved successfully",
-        data=user_responses
-    )
+    users, next_cursor = split_page(apply_keyset(query, USER_PAGE_ORDER, cursor, limit, skip).all(), USER_PAGE_ORDER, limit)
+    
+    # Validated straight from the named tuples, profiles included, no dict per row
+    return build_page(UserListResponse, users, "Users retrieved successfully", limit, next_cursor, selected)
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user_by_id(
+def get_user_by_id(
     user_id: str,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.query(User).options(*joined_profiles()).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    profile_data = None
-    
-    if user.role == UserRole.OPERATOR:
-        profile = db.query(OperatorProfile).filter(OperatorProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "terminal_id": str(profile.terminal_id) if profile.terminal_id else None
-            }
-    elif user.role == UserRole.CARRIER:
-        profile = db.query(CarrierProfile).filter(CarrierProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "company_name": profile.company_name,
-                "status": profile.status.value
-            }
-    elif user.role == UserRole.DRIVER:
-        profile = db.query(DriverProfile).filter(DriverProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "truck_number": profile.truck_number,
-                "truck_plate": profile.truck_plate,
-                "status": profile.status.value,
-                "carrier_user_id": str(profile.carrier_user_id)
-            }
-    
-    return UserResponse(
-        id=str(user.id),
-        email=user.email,
-        role=user.role.value,
-        is_active=user.is_active,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        profile=profile_data
-    )
+    return UserResponse(**serialize_user(user))
 
 
 @router.patch("/users/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: str,
     user_update: UserUpdate,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -172,10 +88,13 @@ async def update_user(
             raise HTTPException(status_code=400, detail="Email already registered by another user")
         user.email = user_update.email
     
-    if user_update.is_active is not None:
+    token_version = None
+    if user_update.is_active is not None and user_update.is_active != user.is_active:
         user.is_active = user_update.is_active
+        token_version = bump_token_version(db, user.id)
     
     db.commit()
+    invalidate_principal(user.id, token_version)
     db.refresh(user)
     
     return UserResponse(
@@ -189,9 +108,9 @@ async def update_user(
 
 
 @router.delete("/users/{user_id}", response_model=dict)
-async def delete_user(
+def delete_user(
     user_id: str,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -199,8 +118,10 @@ async def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Actually delete the user (this will trigger CASCADE deletion for related records)
+    token_version = bump_token_version(db, user.id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id, token_version)
     
     return {
         "status": "success",
@@ -209,52 +130,38 @@ async def delete_user(
 
 
 @router.get("/terminals", response_model=TerminalListResponse)
-async def get_all_terminals(
+def get_all_terminals(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     status: Optional[TerminalStatus] = None,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    fields: Optional[str] = None,  # Comma-separated TerminalResponse fields
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
-    query = db.query(Terminal)
+    selected = parse_fields(fields, TerminalResponse)
+    query = db.query(TERMINAL_ROW.only(selected, TERMINAL_PAGE_ORDER))
     
     if status:
         query = query.filter(Terminal.status == status)
     
-    terminals = query.offset(skip).limit(limit).all()
-    terminal_responses = []
-    
-    for terminal in terminals:
-        terminal_responses.append({
-            "id": str(terminal.id),
-            "name": terminal.name,
-            "status": terminal.status.value,
-            "max_slots": terminal.max_slots,
-            "available_slots": terminal.available_slots,
-            "coord_x": terminal.coord_x,
-            "coord_y": terminal.coord_y,
-            "created_at": terminal.created_at,
-            "updated_at": terminal.updated_at
-        })
-    
-    return TerminalListResponse(
-        status="success",
-        message="Terminals retrieved successfully",
-        data=terminal_responses
-    )
+    terminals, next_cursor = split_page(apply_keyset(query, TERMINAL_PAGE_ORDER, cursor, limit, skip).all(), TERMINAL_PAGE_ORDER, limit)
+    
+    # Validated straight from the named tuples, no dict per row
+    return build_page(TerminalListResponse, terminals, "Terminals retrieved successfully", limit, next_cursor, selected)
 
 
 @router.post("/terminals", response_model=TerminalResponse)
-async def create_terminal(
+def create_terminal(
     terminal_create: TerminalCreate,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
     terminal = Terminal(
         name=terminal_create.name,
         status=TerminalStatus.ACTIVE,  # Default to active
         max_slots=terminal_create.max_slots,
-        available_slots=terminal_create.available_slots,
+        available_slots=terminal_create.max_slots,  # No bookings yet
         coord_x=terminal_create.coord_x,
         coord_y=terminal_create.coord_y
     )
@@ -262,6 +169,7 @@ async def create_terminal(
     db.add(terminal)
     db.commit()
     db.refresh(terminal)
+    availability_index.invalidate_terminals()
     
     return TerminalResponse(
         id=str(terminal.id),
@@ -277,10 +185,10 @@ async def create_terminal(
 
 
 @router.put("/terminals/{terminal_id}", response_model=TerminalResponse)
-async def update_terminal(
+def update_terminal(
     terminal_id: str,
     terminal_update: TerminalUpdate,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
     terminal = db.query(Terminal).filter(Terminal.id == terminal_id).first()
@@ -292,9 +200,12 @@ async def update_terminal(
     if terminal_update.status is not None:
         terminal.status = terminal_update.status
     if terminal_update.max_slots is not None:
+        # Shift the counter by the change in capacity within the UPDATE, so
+        # bookings taken or released meanwhile are not overwritten
+        terminal.available_slots = func.greatest(
+            Terminal.available_slots + terminal_update.max_slots - Terminal.max_slots, 0
+        )
         terminal.max_slots = terminal_update.max_slots
-    if terminal_update.available_slots is not None:
-        terminal.available_slots = terminal_update.available_slots
     if terminal_update.coord_x is not None:
         terminal.coord_x = terminal_update.coord_x
     if terminal_update.coord_y is not None:
@@ -302,6 +213,7 @@ async def update_terminal(
     
     db.commit()
     db.refresh(terminal)
+    availability_index.invalidate_terminals()
     
     return TerminalResponse(
         id=str(terminal.id),
@@ -317,52 +229,30 @@ async def update_terminal(
 
 
 @router.get("/carriers", response_model=CarrierListResponse)
-async def get_all_carriers(
+def get_all_carriers(
     skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None,
-    current_user: User = Depends(require_role(["ADMIN", "OPERATOR"])),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[CarrierStatus] = None,
+    current_user: Principal = Depends(require_role(["ADMIN", "OPERATOR"])),
     db: Session = Depends(get_sync_db)
 ):
-    # Query users with carrier role
-    user_query = db.query(User).filter(User.role == UserRole.CARRIER)
+    # Single join of carrier users and their profiles, served by the (status, created_at, user_id) index
+    query = db.query(CARRIER_ROW).join(User, User.id == CarrierProfile.user_id).filter(User.role == UserRole.CARRIER)
     
-    # Apply status filter if provided
     if status:
-        user_ids_with_status = db.query(CarrierProfile.user_id).filter(CarrierProfile.status.value == status).subquery()
-        user_query = user_query.filter(User.id.in_(user_ids_with_status))
-    
-    users = user_query.offset(skip).limit(limit).all()
-    carrier_responses = []
-    
-    for user in users:
-        profile = db.query(CarrierProfile).filter(CarrierProfile.user_id == user.id).first()
-        if profile:
-            carrier_responses.append({
-                "user_id": str(user.id),
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "company_name": profile.company_name,
-                "status": profile.status.value,
-                "proof_document_url": profile.proof_document_url,
-                "created_at": profile.created_at,
-                "updated_at": profile.updated_at
-            })
-    
-    return CarrierListResponse(
-        status="success",
-        message="Carriers retrieved successfully",
-        data=carrier_responses
-    )
+        query = query.filter(CarrierProfile.status == status)
+    
+    profiles, next_cursor = split_page(apply_keyset(query, CARRIER_PAGE_ORDER, cursor, limit, skip).all(), CARRIER_PAGE_ORDER, limit)
+    
+    # Validated straight from the named tuples, no dict per row
+    return build_page(CarrierListResponse, profiles, "Carriers retrieved successfully", limit, next_cursor)
 
 
 @router.post("/carriers/approve", response_model=dict)
-async def approve_carrier(
+def approve_carrier(
     approval_request: CarrierApprovalRequest,
-    current_user: User = Depends(require_role(["ADMIN", "OPERATOR"])),
+    current_user: Principal = Depends(require_role(["ADMIN", "OPERATOR"])),
     db: Session = Depends(get_sync_db)
 ):
     carrier_user = db.query(User).filter(User.id == approval_request.carrier_user_id).first()
@@ -374,7 +264,9 @@ async def approve_carrier(
         raise HTTPException(status_code=404, detail="Carrier profile not found")
     
     profile.status = approval_request.status
+    token_version = bump_token_version(db, profile.user_id)
     db.commit()
+    invalidate_principal(profile.user_id, token_version)
     
     # Send notification to carrier about status change
     notification = Notification(
@@ -393,58 +285,63 @@ async def approve_carrier(
 
 
 @router.get("/bookings", response_model=BookingListResponse)
-async def get_all_bookings(
+def get_all_bookings(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     status: Optional[BookingStatus] = None,
     date: Optional[str] = None,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
-    query = db.query(Booking)
+    selected = parse_fields(fields, BookingResponse)
+    query = db.query(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER))
+    
+    if status:
+        query = query.filter(Booking.status == status)
+    
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
+    
+    bookings, next_cursor = split_page(apply_keyset(query, BOOKING_PAGE_ORDER, cursor, limit, skip).all(), BOOKING_PAGE_ORDER, limit)
+    
+    # Validated straight from the named tuples, no dict per row
+    return build_page(BookingListResponse, bookings, "Bookings retrieved successfully", limit, next_cursor, selected)
+
+
+@router.get("/bookings/export")
+def export_all_bookings(
+    export_format: BookingExportFormatEnum = Query(BookingExportFormatEnum.NDJSON, alias="format"),
+    status: Optional[BookingStatus] = None,
+    date: Optional[str] = None,
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["ADMIN"]))
+):
+    # Filters are checked here, so a bad parameter fails before the body starts
+    selected = parse_fields(fields, BookingResponse)
+    query = select(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER))
     
     if status:
         query = query.filter(Booking.status == status)
     
-    if date:
-        from datetime import datetime
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(Booking.date == date_obj)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    
-    bookings = query.offset(skip).limit(limit).all()
-    booking_responses = []
-    
-    for booking in bookings:
-        booking_responses.append({
-            "id": str(booking.id),
-            "carrier_user_id": str(booking.carrier_user_id),
-            "driver_user_id": str(booking.driver_user_id) if booking.driver_user_id else None,
-            "terminal_id": str(booking.terminal_id),
-            "date": booking.date,
-            "start_time": booking.start_time,
-            "end_time": booking.end_time,
-            "status": booking.status.value,
-            "decided_by_operator_user_id": str(booking.decided_by_operator_user_id) if booking.decided_by_operator_user_id else None,
-            "qr_payload": booking.qr_payload,
-            "created_at": booking.created_at,
-            "updated_at": booking.updated_at
-        })
-    
-    return BookingListResponse(
-        status="success",
-        message="Bookings retrieved successfully",
-        data=booking_responses
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
+    
+    return StreamingResponse(
+        export_bookings(query.order_by(*BOOKING_PAGE_ORDER), export_format, selected),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{export_format.value}"'}
     )
 
 
 @router.post("/operators/{operator_id}/assign-terminal", response_model=dict)
-async def assign_operator_to_terminal(
+def assign_operator_to_terminal(
     operator_id: str,
     terminal_id: str,
-    current_user: User = Depends(require_role(["ADMIN"])),
+    current_user: Principal = Depends(require_role(["ADMIN"])),
     db: Session = Depends(get_sync_db)
 ):
     """Assign an operator to a terminal"""
@@ -465,11 +362,25 @@ async def assign_operator_to_terminal(
     
     # Assign terminal
     operator_profile.terminal_id = terminal_id
+    token_version = bump_token_version(db, operator_profile.user_id)
     db.commit()
+    invalidate_principal(operator_id, token_version)
     
     return {
         "status": "success",
         "message": f"Operator assigned to terminal {terminal.name}",
         "operator_id": operator_id,
         "terminal_id": terminal_id
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/db/pool", response_model=dict)
+def get_db_pool_statistics(
+    current_user: Principal = Depends(require_role(["ADMIN"]))
+):
+    """Live connection pool usage for the sync and async engines"""
+    return {
+        "status": "success",
+        "message": "Pool statistics retrieved successfully",
+        "data": get_pool_statistics()
+    }
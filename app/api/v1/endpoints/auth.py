@@ -1,27 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import timedelta, date
+from datetime import datetime, timedelta, date
+from typing import Optional
 from uuid import UUID
-from ....core.database import get_sync_db
-from ....core.security import verify_password, get_password_hash, create_access_token
+from ....core.config import settings
+from ....core.database import get_sync_db, get_async_db
+from ....core.security import (
+    PasswordHasherBusy,
+    create_access_token,
+    create_refresh_token,
+    get_password_hash_async,
+    hash_refresh_token,
+    verify_and_update_password_async,
+)
 from ....models.user import User, UserRole
 from ....models.profile import OperatorProfile, CarrierProfile, DriverProfile, CarrierStatus, DriverStatus
-from ....schemas.auth import LoginRequest, RegisterRequest, TokenResponse
+from ....models.refresh_token import RefreshToken
+from ....schemas.auth import LoginRequest, RegisterRequest, TokenResponse, RefreshRequest, RefreshResponse
 from ....schemas.user import UserCreate
 from ....api.deps import get_current_user
+from ....services.principals import Principal, get_principal_async, principal_claims
+from ....services.profiles import joined_profiles, serialize_user
 
 
 router = APIRouter()
 
 
+def _invalid_refresh_token_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _add_refresh_token(db: AsyncSession, user_id) -> str:
+    """Stage a new refresh token for `user_id`; only its digest is persisted"""
+    token, token_hash = create_refresh_token()
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=token_hash,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return token
+
+
+async def _issue_access_token(db: AsyncSession, user_id, principal: Optional[Principal] = None) -> str:
+    claims = {"sub": str(user_id)}
+    if settings.STATELESS_AUTH:
+        # Sign the current role context into the token so requests can skip the lookup
+        principal = principal or await get_principal_async(db, user_id, use_cache=False)
+        claims.update(principal_claims(principal))
+    return create_access_token(data=claims)
+
+
+def _hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/login", response_model=TokenResponse)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_sync_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # Load the user together with its role profile in a single round trip
+    result = await db.execute(
+        select(User).options(*joined_profiles()).where(User.email == form_data.username)
+    )
+    user = result.unique().scalar_one_or_none()
+    
+    # bcrypt runs in the hashing process pool, not on the event loop
+    password_valid, new_hash = False, None
+    if user:
+        try:
+            password_valid, new_hash = await verify_and_update_password_async(form_data.password, user.password_hash)
+        except PasswordHasherBusy:
+            raise _hasher_busy_exception()
+    
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -34,64 +97,24 @@ async def login(
             detail="Inactive user"
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    # Transparently upgrade the stored hash when BCRYPT_ROUNDS changed
+    if new_hash:
+        user.password_hash = new_hash
     
-    # Prepare user response with profile data
-    profile_data = None
-    if user.role == UserRole.OPERATOR:
-        profile = db.query(OperatorProfile).filter(OperatorProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "terminal_id": str(profile.terminal_id) if profile.terminal_id else None
-            }
-    elif user.role == UserRole.CARRIER:
-        profile = db.query(CarrierProfile).filter(CarrierProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "company_name": profile.company_name,
-                "status": profile.status.value
-            }
-    elif user.role == UserRole.DRIVER:
-        profile = db.query(DriverProfile).filter(DriverProfile.user_id == user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "truck_number": profile.truck_number,
-                "truck_plate": profile.truck_plate,
-                "status": profile.status.value
-            }
+    refresh_token = _add_refresh_token(db, user.id)
+    await db.commit()
+    if new_hash:
+        await db.refresh(user, ["updated_at"])
     
-    user_response = {
-        "id": str(user.id),
-        "email": user.email,
-        "role": user.role.value,
-        "is_active": user.is_active,
-        "created_at": user.created_at,
-        "updated_at": user.updated_at,
-        "profile": profile_data
-    }
+    # Create access token
+    access_token = await _issue_access_token(db, user.id)
+    
+    user_response = serialize_user(user)
     
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         user=user_response
     )
 
@@ -99,10 +122,10 @@ async def login(
 @router.post("/register", response_model=TokenResponse)
 async def register(
     register_data: RegisterRequest,
-    db: Session = Depends(get_sync_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == register_data.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == register_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -120,10 +143,13 @@ async def register(
                 detail="Invalid birth_date format. Use YYYY-MM-DD"
             )
     
+    # Hash the password in the hashing process pool
+    try:
+        hashed_password = await get_password_hash_async(register_data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy_exception()
+    
     try:
-        # Hash the password
-        hashed_password = get_password_hash(register_data.password)
-        
         # Create the user
         user = User(
             email=register_data.email,
@@ -133,7 +159,7 @@ async def register(
         )
         
         db.add(user)
-        db.flush()  # Get user.id without committing
+        await db.flush()  # Get user.id without committing
         
         # Create profile based on role
         if user.role == UserRole.CARRIER:
@@ -183,24 +209,22 @@ async def register(
             )
             db.add(profile)
         
-        db.commit()
-        db.refresh(user)
+        refresh_token = _add_refresh_token(db, user.id)
+        await db.commit()
+        await db.refresh(user)
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
         )
     
     # Create access token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
+    access_token = await _issue_access_token(db, user.id)
     
     user_response = {
         "id": str(user.id),
@@ -215,5 +239,58 @@ async def register(
     return TokenResponse(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         user=user_response
-    )
\ No newline at end of file
+    )
+
+
+@router.post("/refresh", response_model=RefreshResponse)
+async def refresh_access_token(
+    refresh_request: RefreshRequest,
+    db: AsyncSession = Depends(get_async_db)
+):
+    token_hash = hash_refresh_token(refresh_request.refresh_token)
+    now = datetime.utcnow()
+    
+    # Validate and revoke the presented token in a single statement so it can only be used once
+    user_id = await db.scalar(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == token_hash,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.user_id)
+    )
+    
+    if user_id is None:
+        # A rotated token being replayed has leaked: revoke every session of its user
+        reused_by = await db.scalar(
+            select(RefreshToken.user_id).where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.revoked_at.is_not(None)
+            )
+        )
+        if reused_by:
+            await db.execute(
+                update(RefreshToken)
+                .where(RefreshToken.user_id == reused_by, RefreshToken.revoked_at.is_(None))
+                .values(revoked_at=now)
+            )
+            await db.commit()
+        raise _invalid_refresh_token_exception()
+    
+    principal = await get_principal_async(db, user_id, use_cache=False)
+    if principal is None or not principal.is_active:
+        await db.commit()
+        raise _invalid_refresh_token_exception()
+    
+    new_refresh_token = _add_refresh_token(db, user_id)
+    await db.commit()
+    
+    return RefreshResponse(
+        access_token=await _issue_access_token(db, user_id, principal),
+        token_type="bearer",
+        refresh_token=new_refresh_token
+    )
@@ -1,68 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime, date
-from ....core.database import get_sync_db
+from typing import Optional
+from ....core.config import settings
+from ....core.database import EXCLUSION_VIOLATION, FOREIGN_KEY_VIOLATION, get_sqlstate, get_sync_db, get_async_db
 from ....models.user import User, UserRole
 from ....models.booking import Booking, BookingStatus
-from ....models.profile import DriverProfile
-from ....schemas.booking import BookingResponse, BookingCreate
+from ....models.profile import DriverProfile, CarrierStatus
+from ....schemas.booking import BookingResponse, BookingCreate, BookingBatchCreate, BookingBatchResponse
 from ....schemas.driver import DriverProfileResponse
-from ....api.deps import get_current_user, require_role
+from ....api.deps import get_current_user, require_role, require_role_async
+from ....services.principals import Principal
+from ....services.availability import availability_index, track_booking
+from ....services.booking_batch import create_bookings, expand_recurrence
+from ....services.bookings import BOOKING_PAGE_ORDER, BOOKING_ROW
+from ....services.booking_state import transition
+from ....services.slots import hold_slot_async
+from ....utils.pagination import apply_date_filter, apply_keyset, build_list, parse_fields, split_page
 
 
 router = APIRouter()
 
 
 @router.get("/my-bookings", response_model=list[BookingResponse])
-async def get_my_bookings(
+def get_my_bookings(
+    response: Response,
     status: BookingStatus = None,
     date: str = None,  # Expecting YYYY-MM-DD format
-    current_user: User = Depends(require_role(["CARRIER"])),
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["CARRIER"])),
     db: Session = Depends(get_sync_db)
 ):
-    query = db.query(Booking).filter(Booking.carrier_user_id == current_user.id)
+    selected = parse_fields(fields, BookingResponse)
+    query = db.query(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER)).filter(Booking.carrier_user_id == current_user.id)
     
     if status:
         query = query.filter(Booking.status == status)
     
-    if date:
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(Booking.date == date_obj)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
     
-    bookings = query.all()
-    return bookings
+    query = apply_keyset(query, BOOKING_PAGE_ORDER, cursor, limit)
+    bookings, next_cursor = split_page(query.all(), BOOKING_PAGE_ORDER, limit)
+    return build_list(response, BookingResponse, bookings, next_cursor, selected)
 
 
 @router.post("/bookings", response_model=BookingResponse)
 async def create_booking(
     booking_create: BookingCreate,
-    current_user: User = Depends(require_role(["CARRIER"])),
-    db: Session = Depends(get_sync_db)
+    current_user: Principal = Depends(require_role_async(["CARRIER"])),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Verify that the carrier is creating a booking for themselves
     if booking_create.carrier_user_id != str(current_user.id):
         raise HTTPException(status_code=403, detail="Cannot create booking for another carrier")
     
     # Check if the carrier is approved
-    carrier_profile = current_user.carrier_profile
-    if not carrier_profile or carrier_profile.status.value != "APPROVED":
+    if current_user.carrier_status != CarrierStatus.APPROVED:
         raise HTTPException(status_code=403, detail="Carrier not approved to create bookings")
     
-    # Check for time conflicts
-    conflicting_bookings = db.query(Booking).filter(
-        Booking.terminal_id == booking_create.terminal_id,
-        Booking.date == booking_create.date,
-        Booking.status.in_([BookingStatus.PENDING, BookingStatus.CONFIRMED]),
-        ((Booking.start_time < booking_create.end_time) & (Booking.end_time > booking_create.start_time))
-    ).all()
-    
-    if conflicting_bookings:
-        raise HTTPException(status_code=409, detail="Time slot already booked at this terminal")
+    if booking_create.end_time <= booking_create.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be after start_time")
     
-    # Create the booking
+    # Create the booking; the slot exclusion constraint rejects overlapping
+    # active bookings atomically, so concurrent carriers cannot both win a slot
     booking = Booking(
         carrier_user_id=booking_create.carrier_user_id,
         terminal_id=booking_create.terminal_id,
@@ -73,15 +78,67 @@ async def create_booking(
     )
     
     db.add(booking)
-    db.commit()
-    db.refresh(booking)
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        if get_sqlstate(e) == EXCLUSION_VIOLATION:
+            raise HTTPException(status_code=409, detail="Time slot already booked at this terminal")
+        if get_sqlstate(e) == FOREIGN_KEY_VIOLATION:
+            raise HTTPException(status_code=404, detail="Terminal not found")
+        raise
+    
+    # Take a slot from the terminal's counter only once the row is in: every
+    # transaction locks booking rows before the terminal row
+    if not await hold_slot_async(db, booking_create.terminal_id, booking_create.date):
+        await db.rollback()
+        availability_index.invalidate_terminals()
+        raise HTTPException(status_code=409, detail="No slots left at this terminal")
+    
+    await db.commit()
+    track_booking(booking)
     
     return booking
 
 
+@router.post("/bookings/batch", response_model=BookingBatchResponse)
+async def create_bookings_batch(
+    batch: BookingBatchCreate,
+    current_user: Principal = Depends(require_role_async(["CARRIER"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Verify that the carrier is creating bookings for themselves
+    if batch.carrier_user_id != str(current_user.id):
+        raise HTTPException(status_code=403, detail="Cannot create booking for another carrier")
+    
+    # Check if the carrier is approved, once for the whole batch
+    if current_user.carrier_status != CarrierStatus.APPROVED:
+        raise HTTPException(status_code=403, detail="Carrier not approved to create bookings")
+    
+    slots = [slot.model_dump() for slot in batch.slots]
+    if batch.recurrence:
+        slots += expand_recurrence(batch.recurrence)
+    if not slots:
+        raise HTTPException(status_code=400, detail="No slots to book")
+    if len(slots) > settings.MAX_BOOKING_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch cannot create more than {settings.MAX_BOOKING_BATCH_SIZE} bookings"
+        )
+    
+    results = await create_bookings(db, current_user.id, slots)
+    created = sum(1 for result in results if result["outcome"] == "CREATED")
+    
+    return BookingBatchResponse(
+        status="success",
+        message=f"{created} of {len(results)} bookings created",
+        data=results
+    )
+
+
 @router.get("/drivers", response_model=list[DriverProfileResponse])
-async def get_my_drivers(
-    current_user: User = Depends(require_role(["CARRIER"])),
+def get_my_drivers(
+    current_user: Principal = Depends(require_role(["CARRIER"])),
     db: Session = Depends(get_sync_db)
 ):
     # Get all drivers associated with this carrier
@@ -95,22 +152,28 @@ async def get_my_drivers(
 @router.delete("/bookings/{booking_id}", response_model=dict)
 async def cancel_booking(
     booking_id: str,
-    current_user: User = Depends(require_role(["CARRIER"])),
-    db: Session = Depends(get_sync_db)
+    current_user: Principal = Depends(require_role_async(["CARRIER"])),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = db.query(Booking).filter(
-        Booking.id == booking_id,
+    # Only the owning carrier can cancel, and only while the booking is PENDING
+    booking = await transition(
+        db,
+        booking_id,
+        BookingStatus.CANCELLED,
         Booking.carrier_user_id == current_user.id
-    ).first()
-    
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found or not owned by carrier")
-    
-    # Cannot cancel if already processed
-    if booking.status in [BookingStatus.CONFIRMED, BookingStatus.REJECTED, BookingStatus.CONSUMED]:
-        raise HTTPException(status_code=400, detail="Cannot cancel booking in current status")
+    )
     
-    booking.status = BookingStatus.CANCELLED
-    db.commit()
+    if booking is None:
+        booking = await db.get(Booking, booking_id)
+        
+        if not booking or str(booking.carrier_user_id) != str(current_user.id):
+            raise HTTPException(status_code=404, detail="Booking not found or not owned by carrier")
+        
+        # Cannot cancel if already processed; cancelling twice stays a no-op
+        if booking.status != BookingStatus.CANCELLED:
+            raise HTTPException(status_code=400, detail="Cannot cancel booking in current status")
+    else:
+        await db.commit()
+        track_booking(booking)
     
     return {"status": "success", "message": "Booking cancelled successfully"}
\ No newline at end of file
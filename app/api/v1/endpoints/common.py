@@ -1,12 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ....core.database import get_sync_db
-from ....models.terminal import Terminal
+from datetime import date, timedelta
+from typing import Optional
+from uuid import UUID
+from ....core.config import settings
+from ....core.database import get_sync_db, get_async_db
 from ....models.user import User
-from ....models.profile import OperatorProfile
+from ....schemas.availability import AvailabilityResponse
 from ....schemas.terminal import TerminalResponse, TerminalListResponse
 from ....schemas.user import UserResponse
-from ....api.deps import get_current_user, require_role
+from ....api.deps import get_current_user, get_current_user_async, require_role
+from ....services.availability import find_free_windows
+from ....services.principals import Principal
+from ....services.profiles import joined_profiles, serialize_user
+from ....services.terminals import TERMINAL_PAGE_ORDER, TERMINAL_ROW
+from ....utils.pagination import apply_keyset, build_page, parse_fields, split_page
 
 
 router = APIRouter()
@@ -15,85 +25,55 @@ router = APIRouter()
 @router.get("/terminals", response_model=TerminalListResponse)
 async def get_all_terminals(
     skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_sync_db)
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated TerminalResponse fields
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    selected = parse_fields(fields, TerminalResponse)
+    query = apply_keyset(select(TERMINAL_ROW.only(selected, TERMINAL_PAGE_ORDER)), TERMINAL_PAGE_ORDER, cursor, limit, skip)
+    terminals, next_cursor = split_page((await db.scalars(query)).all(), TERMINAL_PAGE_ORDER, limit)
+    
+    # Validated straight from the named tuples, no dict per row
+    return build_page(TerminalListResponse, terminals, "Terminals retrieved successfully", limit, next_cursor, selected)
+
+
+@router.get("/availability", response_model=AvailabilityResponse)
+async def get_availability(
+    date_from: date,
+    date_to: Optional[date] = None,
+    duration_minutes: int = Query(60, ge=1, le=24 * 60),
+    terminal_id: Optional[UUID] = None,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    terminals = db.query(Terminal).offset(skip).limit(limit).all()
-    terminal_responses = []
+    date_to = date_to or date_from
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= settings.AVAILABILITY_MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range cannot exceed {settings.AVAILABILITY_MAX_RANGE_DAYS} days"
+        )
     
-    for terminal in terminals:
-        terminal_responses.append({
-            "id": str(terminal.id),
-            "name": terminal.name,
-            "status": terminal.status.value,
-            "max_slots": terminal.max_slots,
-            "available_slots": terminal.available_slots,
-            "coord_x": terminal.coord_x,
-            "coord_y": terminal.coord_y,
-            "created_at": terminal.created_at,
-            "updated_at": terminal.updated_at
-        })
+    # Answered from the in-memory availability index, see services/availability.py
+    windows = await find_free_windows(db, date_from, date_to, timedelta(minutes=duration_minutes), terminal_id)
     
-    return TerminalListResponse(
+    return AvailabilityResponse(
         status="success",
-        message="Terminals retrieved successfully",
-        data=terminal_responses
+        message="Availability retrieved successfully",
+        data=windows
     )
 
 
 @router.get("/profile", response_model=UserResponse)
-async def get_my_profile(
-    current_user: User = Depends(get_current_user),
+def get_my_profile(
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_sync_db)
 ):
-    profile_data = None
-    
-    if current_user.role == User.UserRole.OPERATOR:
-        profile = db.query(OperatorProfile).filter(OperatorProfile.user_id == current_user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "terminal_id": str(profile.terminal_id) if profile.terminal_id else None
-            }
-    elif current_user.role == User.UserRole.CARRIER:
-        from ....models.profile import CarrierProfile
-        profile = db.query(CarrierProfile).filter(CarrierProfile.user_id == current_user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "company_name": profile.company_name,
-                "status": profile.status.value
-            }
-    elif current_user.role == User.UserRole.DRIVER:
-        from ....models.profile import DriverProfile
-        profile = db.query(DriverProfile).filter(DriverProfile.user_id == current_user.id).first()
-        if profile:
-            profile_data = {
-                "first_name": profile.first_name,
-                "last_name": profile.last_name,
-                "phone": profile.phone,
-                "gender": profile.gender,
-                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
-                "truck_number": profile.truck_number,
-                "truck_plate": profile.truck_plate,
-                "status": profile.status.value
-            }
+    user = db.query(User).options(*joined_profiles()).filter(User.id == current_user.id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return UserResponse(
-        id=str(current_user.id),
-        email=current_user.email,
-        role=current_user.role.value,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at,
-        updated_at=current_user.updated_at,
-        profile=profile_data
-    )
\ No newline at end of file
+    return UserResponse(**serialize_user(user))
@@ -1,87 +1,117 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ....core.database import get_sync_db
+from typing import Optional
+from ....core.config import settings
+from ....core.database import get_sync_db, get_async_db
 from ....models.user import User, UserRole
 from ....models.booking import Booking, BookingStatus
 from ....schemas.booking import BookingResponse
-from ....api.deps import get_current_user, require_role
+from ....api.deps import get_current_user, require_role, require_role_async
+from ....services.principals import Principal
+from ....services.availability import track_booking
+from ....services.bookings import BOOKING_PAGE_ORDER, BOOKING_ROW
+from ....services.booking_state import assign_driver, transition
+from ....services.gate import issue_qr_payloads
+from ....utils.pagination import apply_date_filter, apply_keyset, build_list, parse_fields, split_page
 
 
 router = APIRouter()
 
 
 @router.get("/my-bookings", response_model=list[BookingResponse])
-async def get_my_assignments(
+def get_my_assignments(
+    response: Response,
     status: BookingStatus = None,
-    current_user: User = Depends(require_role(["DRIVER"])),
+    date: str = None,  # Expecting YYYY-MM-DD format
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["DRIVER"])),
     db: Session = Depends(get_sync_db)
 ):
-    query = db.query(Booking).filter(Booking.driver_user_id == str(current_user.id))
+    selected = parse_fields(fields, BookingResponse)
+    query = db.query(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER)).filter(Booking.driver_user_id == str(current_user.id))
     
     if status:
         query = query.filter(Booking.status == status)
     
-    bookings = query.all()
-    return bookings
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
+    
+    query = apply_keyset(query, BOOKING_PAGE_ORDER, cursor, limit)
+    bookings, next_cursor = split_page(query.all(), BOOKING_PAGE_ORDER, limit)
+    return build_list(response, BookingResponse, bookings, next_cursor, selected)
 
 
 @router.get("/available-bookings", response_model=list[BookingResponse])
-async def get_available_bookings(
+def get_available_bookings(
+    response: Response,
     date: str = None,  # Expecting YYYY-MM-DD format
-    current_user: User = Depends(require_role(["DRIVER"])),
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["DRIVER"])),
     db: Session = Depends(get_sync_db)
 ):
     # Get the driver's carrier
-    driver_profile = current_user.driver_profile
-    if not driver_profile:
+    if not current_user.carrier_user_id:
         raise HTTPException(status_code=404, detail="Driver profile not found")
     
+    selected = parse_fields(fields, BookingResponse)
+    
     # Find bookings that are assigned to the same carrier and are confirmed
-    query = db.query(Booking).filter(
-        Booking.carrier_user_id == driver_profile.carrier_user_id,
+    query = db.query(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER)).filter(
+        Booking.carrier_user_id == current_user.carrier_user_id,
         Booking.status == BookingStatus.CONFIRMED,
         Booking.driver_user_id.is_(None)  # Not yet assigned to a driver
     )
     
-    if date:
-        from datetime import datetime
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(Booking.date == date_obj)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
     
-    bookings = query.all()
-    return bookings
+    query = apply_keyset(query, BOOKING_PAGE_ORDER, cursor, limit)
+    bookings, next_cursor = split_page(query.all(), BOOKING_PAGE_ORDER, limit)
+    return build_list(response, BookingResponse, bookings, next_cursor, selected)
 
 
 @router.post("/assign-to-booking/{booking_id}", response_model=BookingResponse)
 async def assign_to_booking(
     booking_id: str,
-    current_user: User = Depends(require_role(["DRIVER"])),
-    db: Session = Depends(get_sync_db)
+    current_user: Principal = Depends(require_role_async(["DRIVER"])),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    # Check if the booking belongs to the same carrier as the driver
-    driver_profile = current_user.driver_profile
-    if not driver_profile or booking.carrier_user_id != driver_profile.carrier_user_id:
-        raise HTTPException(status_code=403, detail="Not authorized to assign to this booking")
-    
-    # Check if booking is confirmed and not already assigned
-    if booking.status != BookingStatus.CONFIRMED:
-        raise HTTPException(status_code=400, detail="Can only assign to confirmed bookings")
+    # Claim the booking in one conditional update so two drivers cannot both get it;
+    # the gate QR code is re-signed for this driver in the same update
+    payloads = await issue_qr_payloads(db, [booking_id], driver_id=current_user.id)
+    booking = await assign_driver(
+        db,
+        booking_id,
+        current_user.id,
+        current_user.carrier_user_id,
+        qr_payload=next(iter(payloads.values()), None)
+    )
     
-    if booking.driver_user_id:
+    if booking is None:
+        booking = await db.get(Booking, booking_id)
+        
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        
+        # Check if the booking belongs to the same carrier as the driver
+        if not current_user.carrier_user_id or str(booking.carrier_user_id) != str(current_user.carrier_user_id):
+            raise HTTPException(status_code=403, detail="Not authorized to assign to this booking")
+        
+        # Check if booking is confirmed and not already assigned
+        if booking.status != BookingStatus.CONFIRMED:
+            raise HTTPException(status_code=400, detail="Can only assign to confirmed bookings")
+        
         raise HTTPException(status_code=400, detail="Booking already assigned to a driver")
     
-    # Assign the driver to the booking
-    booking.driver_user_id = current_user.id
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    track_booking(booking)
     
     return booking
 
@@ -89,25 +119,30 @@ async def assign_to_booking(
 @router.post("/consume-booking/{booking_id}", response_model=BookingResponse)
 async def consume_booking(
     booking_id: str,
-    current_user: User = Depends(require_role(["DRIVER"])),
-    db: Session = Depends(get_sync_db)
+    current_user: Principal = Depends(require_role_async(["DRIVER"])),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    # Check if the booking is assigned to this driver
-    if str(booking.driver_user_id) != str(current_user.id):
-        raise HTTPException(status_code=403, detail="Not authorized to consume this booking")
+    # Only the assigned driver can consume, and only a CONFIRMED booking
+    booking = await transition(
+        db,
+        booking_id,
+        BookingStatus.CONSUMED,
+        Booking.driver_user_id == current_user.id
+    )
     
-    # Check if booking is confirmed
-    if booking.status != BookingStatus.CONFIRMED:
+    if booking is None:
+        booking = await db.get(Booking, booking_id)
+        
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        
+        # Check if the booking is assigned to this driver
+        if str(booking.driver_user_id) != str(current_user.id):
+            raise HTTPException(status_code=403, detail="Not authorized to consume this booking")
+        
         raise HTTPException(status_code=400, detail="Can only consume confirmed bookings")
     
-    # Update booking status to consumed
-    booking.status = BookingStatus.CONSUMED
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    track_booking(booking)
     
-    return booking
\ No newline at end of file
+    return booking
@@ -1,29 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import case
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ....core.database import get_sync_db
+from typing import Optional
+from ....core.config import settings
+from ....core.database import get_sync_db, get_async_db
 from ....models.user import User, UserRole
 from ....models.terminal import Terminal
 from ....models.booking import Booking, BookingStatus
 from ....models.notification import Notification, NotificationType
-from ....schemas.booking import BookingResponse, BookingCreate, BookingUpdate, BookingConfirmationRequest
+from ....schemas.booking import (
+    BookingResponse,
+    BookingCreate,
+    BookingUpdate,
+    BookingConfirmationRequest,
+    BookingDecisionBatch,
+    BookingDecisionBatchResponse,
+    BookingClaimResponse,
+    GateScanRequest,
+    GateScanBatch,
+    GateScanBatchResponse,
+    PlateLookupResponse,
+)
 from ....schemas.terminal import TerminalResponse
-from ....api.deps import get_current_user, require_role
+from ....api.deps import get_current_user, require_role, require_role_async
+from ....services.principals import Principal
+from ....services.availability import track_booking
+from ....services.booking_batch import decide_bookings
+from ....services.booking_queue import claim_available, claim_pending_bookings
+from ....services.bookings import BOOKING_PAGE_ORDER, BOOKING_ROW
+from ....services.booking_state import can_transition, transition, transition_error_detail, update_fields
+from ....services.gate import SCAN_REJECTIONS, check_qr_payload, consume_at_gate, consume_scans, issue_qr_payloads, refusal_reason
+from ....services.plates import find_by_plate
+from ....utils.helpers import normalize_plate
+from ....utils.pagination import apply_date_filter, apply_keyset, build_list, parse_fields, split_page
 
 
 router = APIRouter()
 
 
 @router.get("/my-terminal", response_model=TerminalResponse)
-async def get_my_terminal(
-    current_user: User = Depends(require_role(["OPERATOR"])),
+def get_my_terminal(
+    current_user: Principal = Depends(require_role(["OPERATOR"])),
     db: Session = Depends(get_sync_db)
 ):
-    # Get operator profile to find associated terminal
-    operator_profile = current_user.operator_profile
-    if not operator_profile or not operator_profile.terminal_id:
+    # The assigned terminal comes from the cached principal
+    if not current_user.terminal_id:
         raise HTTPException(status_code=404, detail="No terminal assigned to this operator")
     
-    terminal = db.query(Terminal).filter(Terminal.id == operator_profile.terminal_id).first()
+    terminal = db.query(Terminal).filter(Terminal.id == current_user.terminal_id).first()
     if not terminal:
         raise HTTPException(status_code=404, detail="Terminal not found")
     
@@ -31,103 +56,262 @@ async def get_my_terminal(
 
 
 @router.get("/bookings", response_model=list[BookingResponse])
-async def get_terminal_bookings(
+def get_terminal_bookings(
+    response: Response,
     status: BookingStatus = None,
     date: str = None,  # Expecting YYYY-MM-DD format
-    current_user: User = Depends(require_role(["OPERATOR"])),
+    date_from: Optional[str] = None,  # Inclusive range, YYYY-MM-DD
+    date_to: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # Comma-separated BookingResponse fields
+    current_user: Principal = Depends(require_role(["OPERATOR"])),
     db: Session = Depends(get_sync_db)
 ):
     # Get operator's terminal
-    operator_profile = current_user.operator_profile
-    if not operator_profile or not operator_profile.terminal_id:
+    if not current_user.terminal_id:
         raise HTTPException(status_code=403, detail="Operator not assigned to a terminal")
     
-    query = db.query(Booking).filter(Booking.terminal_id == operator_profile.terminal_id)
+    selected = parse_fields(fields, BookingResponse)
+    query = db.query(BOOKING_ROW.only(selected, BOOKING_PAGE_ORDER)).filter(Booking.terminal_id == current_user.terminal_id)
     
     if status:
         query = query.filter(Booking.status == status)
     
-    if date:
-        from datetime import datetime
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d").date()
-            query = query.filter(Booking.date == date_obj)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    query = apply_date_filter(query, Booking.date, date, date_from, date_to)
     
-    bookings = query.all()
-    return bookings
+    query = apply_keyset(query, BOOKING_PAGE_ORDER, cursor, limit)
+    bookings, next_cursor = split_page(query.all(), BOOKING_PAGE_ORDER, limit)
+    return build_list(response, BookingResponse, bookings, next_cursor, selected)
 
 
-@router.post("/bookings/confirm", response_model=BookingResponse)
-async def confirm_booking(
-    confirmation_request: BookingConfirmationRequest,
-    current_user: User = Depends(require_role(["OPERATOR"])),
-    db: Session = Depends(get_sync_db)
-):
-    booking = db.query(Booking).filter(Booking.id == confirmation_request.booking_id).first()
+async def _booking_update_error(
+    db: AsyncSession,
+    booking_id: str,
+    current_user: Principal,
+    to_status: Optional[BookingStatus] = None
+) -> HTTPException:
+    """Explain why a guarded booking update matched no row"""
+    booking = await db.get(Booking, booking_id)
     if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
+        return HTTPException(status_code=404, detail="Booking not found")
     
     # Check if the booking is for the operator's terminal
-    operator_profile = current_user.operator_profile
-    if not operator_profile or booking.terminal_id != operator_profile.terminal_id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this booking")
+    if not current_user.terminal_id or booking.terminal_id != current_user.terminal_id:
+        return HTTPException(status_code=403, detail="Not authorized to modify this booking")
     
-    # Update booking status
-    booking.status = confirmation_request.status
-    booking.decided_by_operator_user_id = current_user.id
+    if to_status is not None and not can_transition(booking.status, to_status):
+        return HTTPException(status_code=400, detail=transition_error_detail(booking.status, to_status))
     
-    # Generate QR payload if booking is confirmed
+    if booking.claimed_by_operator_user_id not in (None, current_user.id):
+        return HTTPException(status_code=409, detail="Booking is claimed by another operator")
+    return HTTPException(status_code=409, detail="Booking was modified concurrently, please retry")
+
+
+@router.post("/bookings/confirm", response_model=BookingResponse)
+async def confirm_booking(
+    confirmation_request: BookingConfirmationRequest,
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    values = {
+        "decided_by_operator_user_id": current_user.id,
+        "claimed_by_operator_user_id": None,
+        "claimed_until": None,
+    }
+    
+    # Sign the gate QR code if the booking is confirmed
     if confirmation_request.status == BookingStatus.CONFIRMED:
-        from ....utils.helpers import generate_qr_payload
-        booking.qr_payload = generate_qr_payload(
-            str(booking.id), 
-            str(booking.terminal_id), 
-            booking.updated_at or booking.created_at
-        )
+        payloads = await issue_qr_payloads(db, [confirmation_request.booking_id])
+        values["qr_payload"] = next(iter(payloads.values()), None)
     
-    db.commit()
-    db.refresh(booking)
+    # Decide only if the booking is at the operator's terminal and not claimed by another operator
+    booking = await transition(
+        db,
+        confirmation_request.booking_id,
+        confirmation_request.status,
+        Booking.terminal_id == current_user.terminal_id,
+        claim_available(current_user.id),
+        **values
+    )
+    if booking is None:
+        raise await _booking_update_error(db, confirmation_request.booking_id, current_user, confirmation_request.status)
     
-    # Create notification for the carrier
-    notification = Notification(
+    # Notify the carrier in the same transaction as the decision
+    db.add(Notification(
         user_id=booking.carrier_user_id,
         type=NotificationType.BOOKING_CONFIRMED,
         message=f"Your booking for {booking.date} has been {confirmation_request.status.value}",
         related_booking_id=booking.id
-    )
-    db.add(notification)
-    db.commit()
+    ))
+    await db.commit()
+    track_booking(booking)
     
     return booking
 
 
+@router.post("/bookings/decisions", response_model=BookingDecisionBatchResponse)
+async def decide_bookings_batch(
+    batch: BookingDecisionBatch,
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user.terminal_id:
+        raise HTTPException(status_code=404, detail="Operator not assigned to any terminal")
+    if not batch.decisions:
+        raise HTTPException(status_code=400, detail="No decisions given")
+    if len(batch.decisions) > settings.MAX_BOOKING_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch cannot decide more than {settings.MAX_BOOKING_BATCH_SIZE} bookings"
+        )
+    
+    results = await decide_bookings(db, current_user, [decision.model_dump() for decision in batch.decisions])
+    decided = sum(1 for result in results if result["outcome"] == "DECIDED")
+    
+    return BookingDecisionBatchResponse(
+        status="success",
+        message=f"{decided} of {len(results)} bookings decided",
+        data=results
+    )
+
+
+@router.post("/bookings/claim", response_model=BookingClaimResponse)
+async def claim_bookings(
+    limit: int = Query(10, ge=1, le=settings.MAX_BOOKING_CLAIM_SIZE),
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user.terminal_id:
+        raise HTTPException(status_code=404, detail="Operator not assigned to any terminal")
+    
+    bookings = await claim_pending_bookings(db, current_user, limit)
+    
+    return BookingClaimResponse(
+        status="success",
+        message=f"{len(bookings)} bookings claimed",
+        data=bookings,
+        claimed_until=bookings[0].claimed_until if bookings else None
+    )
+
+
 @router.put("/bookings/{booking_id}", response_model=BookingResponse)
 async def update_booking(
     booking_id: str,
     booking_update: BookingUpdate,
-    current_user: User = Depends(require_role(["OPERATOR"])),
-    db: Session = Depends(get_sync_db)
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    # Check if the booking is for the operator's terminal
-    operator_profile = current_user.operator_profile
-    if not operator_profile or booking.terminal_id != operator_profile.terminal_id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this booking")
-    
     # Update allowed fields
-    if booking_update.status:
-        booking.status = booking_update.status
+    values = {}
     if booking_update.driver_user_id:
-        booking.driver_user_id = booking_update.driver_user_id
+        values["driver_user_id"] = booking_update.driver_user_id
     if booking_update.decided_by_operator_user_id:
-        booking.decided_by_operator_user_id = booking_update.decided_by_operator_user_id
+        values["decided_by_operator_user_id"] = booking_update.decided_by_operator_user_id
+    
+    # Only bookings at the operator's terminal; status changes go through the state machine
+    at_terminal = Booking.terminal_id == current_user.terminal_id
+    to_status = BookingStatus(booking_update.status) if booking_update.status else None
+    
+    # The gate QR is bound to the driver: re-sign it in the same UPDATE when the
+    # booking is confirmed, or when a confirmed booking changes driver
+    if to_status == BookingStatus.CONFIRMED or "driver_user_id" in values:
+        payloads = await issue_qr_payloads(db, [booking_id], values.get("driver_user_id"))
+        payload = next(iter(payloads.values()), None)
+        if to_status == BookingStatus.CONFIRMED:
+            values["qr_payload"] = payload
+        elif payload:
+            values["qr_payload"] = case((Booking.status == BookingStatus.CONFIRMED, payload), else_=Booking.qr_payload)
+    if to_status:
+        # A decision respects other operators' claims and releases the lease, as in confirm_booking
+        booking = await transition(
+            db,
+            booking_id,
+            to_status,
+            at_terminal,
+            claim_available(current_user.id),
+            claimed_by_operator_user_id=None,
+            claimed_until=None,
+            **values
+        )
+    else:
+        booking = await update_fields(db, booking_id, at_terminal, **values)
+    if booking is None:
+        raise await _booking_update_error(db, booking_id, current_user, to_status)
+    
+    await db.commit()
+    track_booking(booking)
+    
+    return booking
+
+
+@router.post("/gate/scan", response_model=BookingResponse)
+async def scan_at_gate(
+    scan: GateScanRequest,
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Signature, terminal and time window are checked without touching the database
+    qr, reason = check_qr_payload(scan.qr_payload, current_user.terminal_id)
+    if qr is None:
+        raise HTTPException(status_code=403, detail=SCAN_REJECTIONS[reason])
+    
+    booking = await consume_at_gate(db, qr)
+    if booking is None:
+        reason = await refusal_reason(db, qr)
+        status_code = {"NOT_FOUND": 404, "NOT_CONFIRMED": 400}.get(reason, 403)
+        raise HTTPException(status_code=status_code, detail=SCAN_REJECTIONS[reason])
     
-    db.commit()
-    db.refresh(booking)
+    await db.commit()
+    track_booking(booking)
     
-    return booking
\ No newline at end of file
+    return booking
+
+
+@router.post("/gate/scans", response_model=GateScanBatchResponse)
+async def scan_batch_at_gate(
+    batch: GateScanBatch,
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user.terminal_id:
+        raise HTTPException(status_code=404, detail="Operator not assigned to any terminal")
+    if not batch.scans:
+        raise HTTPException(status_code=400, detail="No scans given")
+    if len(batch.scans) > settings.MAX_BOOKING_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch cannot consume more than {settings.MAX_BOOKING_BATCH_SIZE} bookings"
+        )
+    
+    results = await consume_scans(db, current_user, [scan.model_dump() for scan in batch.scans])
+    accepted = sum(1 for result in results if result["outcome"] == "ACCEPTED")
+    
+    return GateScanBatchResponse(
+        status="success",
+        message=f"{accepted} of {len(results)} scans accepted",
+        data=results
+    )
+
+
+@router.get("/gate/plates/{plate}", response_model=PlateLookupResponse)
+async def lookup_plate(
+    plate: str,
+    current_user: Principal = Depends(require_role_async(["OPERATOR"])),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not current_user.terminal_id:
+        raise HTTPException(status_code=404, detail="Operator not assigned to any terminal")
+    if not normalize_plate(plate):
+        raise HTTPException(status_code=400, detail="Plate must contain letters or digits")
+    
+    # Served from the per-worker plate index once the terminal's day is loaded
+    drivers = await find_by_plate(db, current_user.terminal_id, plate)
+    if not drivers:
+        raise HTTPException(status_code=404, detail="No driver found for this plate")
+    
+    return PlateLookupResponse(
+        status="success",
+        message=f"{sum(len(driver['bookings']) for driver in drivers)} bookings today for this plate",
+        data=drivers
+    )
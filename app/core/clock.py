@@ -0,0 +1,24 @@
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from .config import settings
+
+
+# Booking dates and times are wall-clock values at the terminals, in
+# TERMINAL_TIMEZONE. "Today" comes from here rather than from the server's or
+# the database's timezone, and instants such as QR validity are compared in UTC.
+
+
+@lru_cache(maxsize=None)
+def terminal_timezone() -> ZoneInfo:
+    return ZoneInfo(settings.TERMINAL_TIMEZONE)
+
+
+def terminal_today() -> date:
+    """Today's date at the terminals"""
+    return datetime.now(terminal_timezone()).date()
+
+
+def terminal_instant(day: date, at: time) -> datetime:
+    """A terminal wall-clock date and time as an aware UTC datetime"""
+    return datetime.combine(day, at, tzinfo=terminal_timezone()).astimezone(timezone.utc)
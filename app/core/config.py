@@ -1,15 +1,92 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # Defaults to DATABASE_URL with the asyncpg driver
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REFRESH_TOKEN_PRUNE_INTERVAL_SECONDS: int = 3600  # Expired refresh tokens are deleted this often; 0 disables
     PROJECT_NAME: str = "Port Terminal API"
     API_V1_STR: str = "/api/v1"
 
+    # IANA timezone of the terminals, in which booking dates and times are given
+    TERMINAL_TIMEZONE: str = "UTC"
+
+    # Password hashing, run in a dedicated process pool
+    BCRYPT_ROUNDS: int = 12  # Changing it rehashes each password at its next login
+    PASSWORD_HASH_WORKERS: int = 2  # Per uvicorn worker: N workers run N x this many bcrypt processes
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # Hashing requests in flight before logins get a 503
+
+    # Authenticated principals cached per worker process
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+
+    # Opt-in: access tokens carry signed role claims, so authorization needs no
+    # database lookup; revocation goes through the per-user token version table
+    STATELESS_AUTH: bool = False
+    TOKEN_VERSION_REFRESH_SECONDS: float = 5.0  # How often each worker reloads the version table
+
+    # Slot availability index, kept per worker process
+    AVAILABILITY_INDEX_TTL_SECONDS: int = 30  # Bounds staleness from other workers' bookings
+    AVAILABILITY_INDEX_MAX_DAYS: int = 366
+    AVAILABILITY_MAX_RANGE_DAYS: int = 31  # Widest date range one availability search may span
+
+    # Terminal slot counters are reconciled from the bookings table at startup and this often
+    SLOT_RECONCILE_INTERVAL_SECONDS: int = 900  # 0 disables the periodic job
+
+    # Bookings one batch request may create (recurrences included), decide or consume at the gate
+    MAX_BOOKING_BATCH_SIZE: int = 200
+
+    # Operator work queue
+    BOOKING_CLAIM_LEASE_SECONDS: int = 120  # Claimed bookings return to the queue after this
+    MAX_BOOKING_CLAIM_SIZE: int = 50
+
+    # Signed booking QR codes, checked at the gate without a database lookup
+    QR_SIGNING_KEY: Optional[str] = None  # Defaults to SECRET_KEY
+    QR_VALID_EARLY_MINUTES: int = 120  # Gate accepts a truck this long before its slot starts
+    QR_VALID_LATE_MINUTES: int = 60  # ... and this long after it ends
+    GATE_MAX_SCAN_AGE_MINUTES: int = 30  # Buffered scans taken longer ago than this are refused
+
+    # Truck plate lookup index, kept per worker process
+    PLATE_INDEX_TTL_SECONDS: int = 30  # Bounds staleness from other workers' assignments
+    PLATE_INDEX_MAX_TERMINALS: int = 256
+
+    # Listing endpoints
+    DEFAULT_PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 500
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched per round trip by streaming exports
+
+    # Connection pools, one per engine and per uvicorn worker: each worker can
+    # open up to both pool sizes plus both overflows
+    SYNC_DB_POOL_SIZE: int = 10
+    SYNC_DB_MAX_OVERFLOW: int = 10
+    ASYNC_DB_POOL_SIZE: int = 10
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+
+    # Worker threads for handlers on the sync (psycopg2) session; defaults to
+    # the sync pool size + overflow, and may not exceed it, so threads never
+    # queue on the connection pool
+    SYNC_DB_THREADPOOL_SIZE: Optional[int] = None
+
+    @model_validator(mode="after")
+    def size_sync_threadpool(self):
+        connections = self.SYNC_DB_POOL_SIZE + self.SYNC_DB_MAX_OVERFLOW
+        if self.SYNC_DB_THREADPOOL_SIZE is None:
+            self.SYNC_DB_THREADPOOL_SIZE = connections
+        elif not 0 < self.SYNC_DB_THREADPOOL_SIZE <= connections:
+            raise ValueError(
+                f"SYNC_DB_THREADPOOL_SIZE must be between 1 and SYNC_DB_POOL_SIZE + SYNC_DB_MAX_OVERFLOW ({connections})"
+            )
+        return self
+
     class Config:
         env_file = ".env"
 
@@ -1,19 +1,150 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Optional
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
 
 
+# SQLSTATE raised when a row conflicts with an exclusion constraint
+EXCLUSION_VIOLATION = "23P01"
+# SQLSTATE raised when a row references a missing parent row
+FOREIGN_KEY_VIOLATION = "23503"
+
+# libpq-only query parameters that asyncpg does not understand
+_LIBPQ_ONLY_PARAMS = ("sslmode", "channel_binding")
+
+
+def _build_async_url(database_url: str):
+    """Derive an asyncpg URL (and connect args) from the psycopg2 DATABASE_URL"""
+    url = make_url(database_url)
+    connect_args = {}
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        # asyncpg takes the libpq modes as is; verify-ca and verify-full keep checking the certificate
+        connect_args["ssl"] = sslmode
+    url = url.set(drivername="postgresql+asyncpg").difference_update_query(_LIBPQ_ONLY_PARAMS)
+    return url, connect_args
+
+
+class PoolStats:
+    """Thread-safe counters for connection checkouts from a pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+def _instrumented_pool(pool_class, stats: PoolStats):
+    """Subclass a queue pool so every checkout records its wait time in `stats`"""
+
+    class InstrumentedPool(pool_class):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.record(time.perf_counter() - started, timed_out=True)
+                raise
+            stats.record(time.perf_counter() - started)
+            return connection
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
 # Sync engine and session for all operations (compatible with psycopg2)
-sync_engine = create_engine(settings.DATABASE_URL)
+sync_engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=_instrumented_pool(QueuePool, sync_pool_stats),
+    **_pool_options(settings.SYNC_DB_POOL_SIZE, settings.SYNC_DB_MAX_OVERFLOW),
+)
 SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
+# Async engine and session (asyncpg) for handlers that must not block the event loop
+_async_url, _async_connect_args = _build_async_url(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    poolclass=_instrumented_pool(AsyncAdaptedQueuePool, async_pool_stats),
+    **_pool_options(settings.ASYNC_DB_POOL_SIZE, settings.ASYNC_DB_MAX_OVERFLOW),
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
 
 def get_sync_db():
+    # The session checks out a connection lazily, on its first query, so the
+    # connection is held by the worker thread running the handler and returned
+    # to the pool as soon as the handler's dependencies are torn down
     db = SyncSessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_statistics() -> dict:
+    return {
+        "sync": sync_pool_stats.snapshot(sync_engine.pool),
+        "async": async_pool_stats.snapshot(async_engine.pool),
+    }
+
+
+def get_sqlstate(error: exc.DBAPIError) -> Optional[str]:
+    """SQLSTATE of a wrapped driver error, for both psycopg2 and asyncpg"""
+    return getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
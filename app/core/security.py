@@ -1,11 +1,35 @@
+import asyncio
+import hashlib
+import multiprocessing
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max rounds to the configured cost makes passlib flag any hash
+# created with a different cost as needing an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing queue is full"""
+
+
+_hash_executor: Optional[ProcessPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
+_hash_in_flight = 0
 
 
 def get_password_hash(password: str) -> str:
@@ -16,6 +40,71 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash when the stored one uses an outdated cost"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _get_hash_executor() -> ProcessPoolExecutor:
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            # spawn: never fork a process that is running an event loop and worker threads
+            _hash_executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_executor
+
+
+def _replace_broken_executor(broken: ProcessPoolExecutor):
+    # A pool whose worker died (OOM kill, SIGKILL) refuses all further work;
+    # concurrent callers that saw the same pool break replace it only once
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is broken:
+            _hash_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_in_hash_pool(fn, *args):
+    # Only the event loop thread touches the counter, so no lock is needed
+    global _hash_in_flight
+    if _hash_in_flight >= settings.PASSWORD_HASH_QUEUE_SIZE:
+        raise PasswordHasherBusy()
+    _hash_in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        # Retried once on a fresh pool; a pool that breaks again answers 503
+        for attempt in range(2):
+            executor = _get_hash_executor()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                _replace_broken_executor(executor)
+        raise PasswordHasherBusy()
+    finally:
+        _hash_in_flight -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing process pool, keeping bcrypt off the event loop"""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the hashing process pool, see `verify_and_update_password`"""
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_password_hasher():
+    global _hash_executor
+    with _hash_executor_lock:
+        executor, _hash_executor = _hash_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -28,9 +117,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_refresh_token() -> Tuple[str, bytes]:
+    """Return a new opaque refresh token and the SHA-256 digest stored server-side"""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
 def decode_access_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
-        raise JWTError("Could not validate credentials")
\ No newline at end of file
+        raise JWTError("Could not validate credentials")
@@ -1,11 +1,46 @@
+import asyncio
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
+from .core.database import async_engine, sync_engine
+from .core.security import shutdown_password_hasher
+from .services.refresh_tokens import prune_refresh_tokens_forever
+from .services.slots import reconcile_all_terminals, reconcile_available_slots_forever
+from .services.token_versions import load_token_versions, refresh_token_versions_forever
+from .utils.pagination import NEXT_CURSOR_HEADER
 from .api.v1.endpoints import auth, admin, common
 from .api.v1.endpoints import operator, carrier, driver
 
 
-app = FastAPI(title=settings.PROJECT_NAME, version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync-session handlers are plain `def` endpoints, which FastAPI runs in this
+    # thread pool; bound it to what the sync connection pool can serve
+    to_thread.current_default_thread_limiter().total_tokens = settings.SYNC_DB_THREADPOOL_SIZE
+    # Counters drift while no worker runs (dates roll past, manual edits); fix
+    # them before the first booking is checked against them
+    await reconcile_all_terminals()
+    background_tasks = []
+    if settings.SLOT_RECONCILE_INTERVAL_SECONDS:
+        background_tasks.append(asyncio.create_task(reconcile_available_slots_forever()))
+    if settings.REFRESH_TOKEN_PRUNE_INTERVAL_SECONDS:
+        background_tasks.append(asyncio.create_task(prune_refresh_tokens_forever()))
+    if settings.STATELESS_AUTH:
+        # Token claims are only trusted while this worker's version table is fresh
+        await load_token_versions()
+        background_tasks.append(asyncio.create_task(refresh_token_versions_forever()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    shutdown_password_hasher()
+    # Release pooled connections on shutdown
+    await async_engine.dispose()
+    sync_engine.dispose()
+
+
+app = FastAPI(title=settings.PROJECT_NAME, version="1.0.0", lifespan=lifespan)
 
 
 # CORS middleware
@@ -15,6 +50,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
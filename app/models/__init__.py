@@ -6,6 +6,8 @@ from .notification import Notification, NotificationType
 from .anomaly import Anomaly, AnomalySeverity
 from .audit import AuditLog
 from .chat import ChatSession, ChatMessage, ChatSender
+from .refresh_token import RefreshToken
+from .token_version import UserTokenVersion
 
 __all__ = [
     "User",
@@ -26,5 +28,7 @@ __all__ = [
     "AuditLog",
     "ChatSession",
     "ChatMessage",
-    "ChatSender"
+    "ChatSender",
+    "RefreshToken",
+    "UserTokenVersion"
 ]
\ No newline at end of file
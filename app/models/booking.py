@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Date, Time, Enum, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Date, Time, Enum, ForeignKey, Text, Computed, DDL, Index, event, text
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID, TSRANGE, ExcludeConstraint
 from sqlalchemy.sql import func
 import uuid
 import enum
@@ -15,19 +15,58 @@ class BookingStatus(str, enum.Enum):
     CONSUMED = "CONSUMED"
 
 
+BOOKING_SLOT_CONSTRAINT = "ex_bookings_terminal_slot"
+
+
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Postgres rejects overlapping active bookings at a terminal, atomically
+        ExcludeConstraint(
+            ("terminal_id", "="),
+            ("slot", "&&"),
+            name=BOOKING_SLOT_CONSTRAINT,
+            using="gist",
+            where=text("status IN ('PENDING', 'CONFIRMED')"),  # ACTIVE_BOOKING_STATUSES
+        ),
+        # Operator work queue: pending bookings of a terminal in date order
+        Index(
+            "ix_bookings_pending_queue",
+            "terminal_id", "date", "start_time", "id",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # Listings filter on the owner, optionally a status, then page in
+        # BOOKING_PAGE_ORDER, so each index ends with (date, start_time, id)
+        Index("ix_bookings_terminal_date", "terminal_id", "date", "start_time", "id"),
+        Index("ix_bookings_terminal_status_date", "terminal_id", "status", "date", "start_time", "id"),
+        Index("ix_bookings_carrier_date", "carrier_user_id", "date", "start_time", "id"),
+        Index("ix_bookings_carrier_status_date", "carrier_user_id", "status", "date", "start_time", "id"),
+        Index("ix_bookings_driver_date", "driver_user_id", "date", "start_time", "id"),
+        Index("ix_bookings_date_order", "date", "start_time", "id"),
+        # Driver available bookings: confirmed and not yet assigned
+        Index(
+            "ix_bookings_carrier_unassigned",
+            "carrier_user_id", "date", "start_time", "id",
+            postgresql_where=text("status = 'CONFIRMED' AND driver_user_id IS NULL"),
+        ),
+    )
+    # Fetch server-generated columns with RETURNING instead of a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(PostgresUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    carrier_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
-    driver_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"), index=True)
-    terminal_id = Column(PostgresUUID(as_uuid=True), ForeignKey("terminals.id"), nullable=False, index=True)
-    date = Column(Date, nullable=False, index=True)
+    carrier_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    driver_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"))
+    terminal_id = Column(PostgresUUID(as_uuid=True), ForeignKey("terminals.id"), nullable=False)
+    date = Column(Date, nullable=False)
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=False)
+    slot = Column(TSRANGE, Computed("tsrange(date + start_time, date + end_time, '[)')", persisted=True))
     status = Column(Enum(BookingStatus), nullable=False, index=True)
     decided_by_operator_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"))
     qr_payload = Column(Text)
+    # Work queue lease, see services/booking_queue.py
+    claimed_by_operator_user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id"))
+    claimed_until = Column(DateTime)
     created_at = Column(DateTime, default=func.current_timestamp())
     updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
 
@@ -37,4 +76,12 @@ class Booking(Base):
     terminal = relationship("Terminal", back_populates="bookings")
     decided_by_operator = relationship("User", foreign_keys=[decided_by_operator_user_id], back_populates="bookings_decided_by")
     notifications = relationship("Notification", back_populates="related_booking")
-    anomalies = relationship("Anomaly", back_populates="booking")
\ No newline at end of file
+    anomalies = relationship("Anomaly", back_populates="booking")
+
+
+# The exclusion constraint compares terminal_id with "=" inside a GiST index
+event.listen(
+    Booking.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"),
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Date, Float, Enum, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Date, Float, Enum, ForeignKey, Text, Index, literal_column
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.sql import func
 import uuid
@@ -20,6 +20,12 @@ class DriverStatus(str, enum.Enum):
     SUSPENDED = "SUSPENDED"
 
 
+def plate_key(plate):
+    """Truck plate reduced to upper-case letters and digits, as `utils.helpers.normalize_plate` does"""
+    # Inline literals so queries match the expression index
+    return func.upper(func.regexp_replace(plate, literal_column("'[^[:alnum:]]'"), literal_column("''"), literal_column("'g'")))
+
+
 class OperatorProfile(Base):
     __tablename__ = "operator_profiles"
 
@@ -56,6 +62,11 @@ class CarrierProfile(Base):
     # Relationships
     user = relationship("User", back_populates="carrier_profile")
 
+    __table_args__ = (
+        # Carrier listing: filter by status, paginate in creation order
+        Index("ix_carrier_profiles_status_created_at", "status", "created_at", "user_id"),
+    )
+
 
 class DriverProfile(Base):
     __tablename__ = "driver_profiles"
@@ -76,4 +87,9 @@ class DriverProfile(Base):
 
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="driver_profile")
-    carrier_user = relationship("User", foreign_keys=[carrier_user_id], back_populates="carrier_drivers")
\ No newline at end of file
+    carrier_user = relationship("User", foreign_keys=[carrier_user_id], back_populates="carrier_drivers")
+
+    __table_args__ = (
+        # Gate check-in: look drivers up by normalized truck plate
+        Index("ix_driver_profiles_plate_key", plate_key(truck_plate)),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy.sql import func
+import uuid
+from sqlalchemy.orm import relationship
+from ..core.database import Base
+
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(PostgresUUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(PostgresUUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(LargeBinary(32), nullable=False, unique=True)  # SHA-256 of the token; the token itself is never stored
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime)
+    created_at = Column(DateTime, default=func.current_timestamp())
+
+    # Relationships
+    user = relationship("User", back_populates="refresh_tokens")
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class UserTokenVersion(Base):
+    __tablename__ = "user_token_versions"
+
+    # Only users whose access tokens were revoked have a row; everyone else is at version 0.
+    # No foreign key, so the row outlives a deleted user and keeps rejecting their tokens.
+    user_id = Column(PostgresUUID(as_uuid=True), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp())
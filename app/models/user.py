@@ -35,4 +35,5 @@ class User(Base):
     bookings_decided_by = relationship("Booking", foreign_keys='Booking.decided_by_operator_user_id', back_populates="decided_by_operator")
     notifications = relationship("Notification", back_populates="user")
     audit_logs = relationship("AuditLog", back_populates="actor_user")
-    chat_sessions = relationship("ChatSession", back_populates="user")
\ No newline at end of file
+    chat_sessions = relationship("ChatSession", back_populates="user")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", passive_deletes=True)
\ No newline at end of file
@@ -1,16 +1,19 @@
-from .auth import LoginRequest, RegisterRequest, TokenResponse
+from .auth import LoginRequest, RegisterRequest, TokenResponse, RefreshRequest, RefreshResponse
 from .user import UserBase, UserCreate, UserUpdate, UserResponse, UserProfile
 from .operator import OperatorProfileBase, OperatorProfileCreate, OperatorProfileUpdate, OperatorProfileResponse
 from .carrier import CarrierProfileBase, CarrierProfileCreate, CarrierProfileUpdate, CarrierProfileResponse
 from .driver import DriverProfileBase, DriverProfileCreate, DriverProfileUpdate, DriverProfileResponse
 from .terminal import TerminalBase, TerminalCreate, TerminalUpdate, TerminalResponse
 from .booking import BookingBase, BookingCreate, BookingUpdate, BookingResponse
+from .availability import FreeWindow, TerminalAvailability, AvailabilityResponse
 from .common import ResponseBase, PaginationParams, PaginatedResponse
 
 __all__ = [
     "LoginRequest",
     "RegisterRequest", 
     "TokenResponse",
+    "RefreshRequest",
+    "RefreshResponse",
     "UserBase",
     "UserCreate",
     "UserUpdate",
@@ -36,6 +39,9 @@ __all__ = [
     "BookingCreate",
     "BookingUpdate",
     "BookingResponse",
+    "FreeWindow",
+    "TerminalAvailability",
+    "AvailabilityResponse",
     "ResponseBase",
     "PaginationParams",
     "PaginatedResponse"
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import date, time
+from .common import ResponseBase
+
+
+class FreeWindow(BaseModel):
+    start_time: time
+    end_time: time
+
+
+class TerminalAvailability(BaseModel):
+    terminal_id: str
+    terminal_name: str
+    date: date
+    windows: List[FreeWindow]
+
+
+class AvailabilityResponse(ResponseBase):
+    data: List[TerminalAvailability]
@@ -1,8 +1,9 @@
-from pydantic import BaseModel, field_serializer
-from typing import Optional, Any
+from pydantic import BaseModel, Field, field_serializer, model_validator
+from typing import Annotated, Optional, Any, List
 from datetime import datetime, date, time
 from enum import Enum
-from .common import ResponseBase
+from ..core.config import settings
+from .common import ResponseBase, PaginatedResponse
 
 
 class BookingStatusEnum(str, Enum):
@@ -25,6 +26,44 @@ class BookingCreate(BookingBase):
     pass
 
 
+class BookingSlot(BaseModel):
+    terminal_id: str
+    date: date
+    start_time: time
+    end_time: time
+
+
+class BookingRecurrence(BaseModel):
+    terminal_id: str
+    start_time: time
+    end_time: time
+    date_from: date
+    date_to: date
+    weekdays: List[Annotated[int, Field(ge=0, le=6)]] = [0, 1, 2, 3, 4]  # Monday is 0
+
+    def size(self) -> int:
+        """Number of slots the recurrence expands to, counted without expanding it"""
+        weekdays = set(self.weekdays)
+        weeks, rest = divmod((self.date_to - self.date_from).days + 1, 7)
+        first = self.date_from.weekday()
+        return weeks * len(weekdays) + sum(1 for offset in range(rest) if (first + offset) % 7 in weekdays)
+
+    @model_validator(mode="after")
+    def check_range(self):
+        # Rejected before a single slot is built, however wide the range
+        if self.date_from > self.date_to:
+            raise ValueError("date_from must not be after date_to")
+        if self.size() > settings.MAX_BOOKING_BATCH_SIZE:
+            raise ValueError(f"A recurrence cannot expand to more than {settings.MAX_BOOKING_BATCH_SIZE} bookings")
+        return self
+
+
+class BookingBatchCreate(BaseModel):
+    carrier_user_id: str
+    slots: List[BookingSlot] = []
+    recurrence: Optional[BookingRecurrence] = None  # Expanded and appended to `slots`
+
+
 class BookingUpdate(BaseModel):
     carrier_user_id: Optional[str] = None
     driver_user_id: Optional[str] = None
@@ -58,11 +97,118 @@ class BookingResponse(BaseModel):
         return str(value) if value else None
 
 
-class BookingListResponse(ResponseBase):
+class BookingListResponse(PaginatedResponse[BookingResponse]):
     data: list[BookingResponse]
 
 
+class BookingExportFormatEnum(str, Enum):
+    NDJSON = "ndjson"  # One BookingResponse JSON object per line
+    CSV = "csv"
+
+
 class BookingConfirmationRequest(BaseModel):
     booking_id: str
     status: BookingStatusEnum
-    decided_by_operator_user_id: str
\ No newline at end of file
+    decided_by_operator_user_id: str
+
+
+class GateScanRequest(BaseModel):
+    qr_payload: str
+    scanned_at: Optional[datetime] = None  # When a buffered scan was taken; defaults to now
+
+
+class GateScanBatch(BaseModel):
+    scans: List[GateScanRequest]
+
+
+class GateScanOutcomeEnum(str, Enum):
+    ACCEPTED = "ACCEPTED"
+    INVALID = "INVALID"  # Malformed or forged
+    WRONG_TERMINAL = "WRONG_TERMINAL"
+    NOT_YET_VALID = "NOT_YET_VALID"
+    EXPIRED = "EXPIRED"
+    DUPLICATE = "DUPLICATE"  # Same booking earlier in the batch
+    NOT_FOUND = "NOT_FOUND"
+    NOT_CONFIRMED = "NOT_CONFIRMED"  # Already consumed, or never confirmed
+    SUPERSEDED = "SUPERSEDED"  # Re-signed for the assigned driver
+    STALE = "STALE"  # Taken longer ago than GATE_MAX_SCAN_AGE_MINUTES
+
+
+class GateScanResult(BaseModel):
+    index: int
+    booking_id: Optional[str] = None
+    outcome: GateScanOutcomeEnum
+    detail: Optional[str] = None
+    booking: Optional[BookingResponse] = None
+
+
+class GateScanBatchResponse(ResponseBase):
+    data: List[GateScanResult]
+
+
+class PlateMatch(BaseModel):
+    driver_user_id: str
+    first_name: str
+    last_name: str
+    truck_plate: Optional[str] = None
+    bookings: List[BookingResponse]  # CONFIRMED bookings of today at the operator's terminal
+
+
+class PlateLookupResponse(ResponseBase):
+    data: List[PlateMatch]
+
+
+class BookingBatchOutcomeEnum(str, Enum):
+    CREATED = "CREATED"
+    CONFLICT = "CONFLICT"  # Overlaps an active booking or an earlier slot of the batch
+    NO_SLOTS = "NO_SLOTS"  # Terminal capacity exhausted
+    INVALID = "INVALID"
+
+
+class BookingBatchItemResult(BaseModel):
+    index: int
+    terminal_id: str
+    date: date
+    start_time: time
+    end_time: time
+    outcome: BookingBatchOutcomeEnum
+    detail: Optional[str] = None
+    booking: Optional[BookingResponse] = None
+
+
+class BookingBatchResponse(ResponseBase):
+    data: List[BookingBatchItemResult]
+
+
+class BookingDecision(BaseModel):
+    booking_id: str
+    status: BookingStatusEnum  # CONFIRMED or REJECTED
+
+
+class BookingDecisionBatch(BaseModel):
+    decisions: List[BookingDecision]
+
+
+class BookingDecisionOutcomeEnum(str, Enum):
+    DECIDED = "DECIDED"
+    NOT_FOUND = "NOT_FOUND"  # Unknown or at another terminal
+    NOT_PENDING = "NOT_PENDING"  # Already decided
+    CLAIMED = "CLAIMED"  # Leased to another operator, see /operator/bookings/claim
+    INVALID = "INVALID"
+
+
+class BookingDecisionResult(BaseModel):
+    index: int
+    booking_id: str
+    outcome: BookingDecisionOutcomeEnum
+    detail: Optional[str] = None
+    booking: Optional[BookingResponse] = None
+
+
+class BookingDecisionBatchResponse(ResponseBase):
+    data: List[BookingDecisionResult]
+
+
+class BookingClaimResponse(ResponseBase):
+    data: List[BookingResponse]
+    claimed_until: Optional[datetime] = None  # Decide before then or the bookings return to the queue
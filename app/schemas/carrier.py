@@ -2,7 +2,7 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 from enum import Enum
-from .common import ResponseBase
+from .common import ResponseBase, PaginatedResponse
 
 
 class CarrierStatusEnum(str, Enum):
@@ -47,7 +47,7 @@ class CarrierProfileResponse(CarrierProfileBase):
         from_attributes = True
 
 
-class CarrierListResponse(ResponseBase):
+class CarrierListResponse(PaginatedResponse[CarrierProfileResponse]):
     data: list[CarrierProfileResponse]
 
 
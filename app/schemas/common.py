@@ -20,10 +20,10 @@ class ResponseBase(BaseModel):
 class PaginationParams(BaseModel):
     skip: int = 0
     limit: int = 100
+    cursor: Optional[str] = None
 
 
-class PaginatedResponse(BaseModel):
+class PaginatedResponse(ResponseBase, Generic[T]):
     data: List[T]
-    total: int
-    skip: int
-    limit: int
\ No newline at end of file
+    limit: Optional[int] = None
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to fetch the next page
\ No newline at end of file
@@ -3,7 +3,7 @@ from typing import Optional, Any
 from datetime import datetime
 from enum import Enum
 from uuid import UUID
-from .common import ResponseBase
+from .common import ResponseBase, PaginatedResponse
 
 
 class TerminalStatusEnum(str, Enum):
@@ -19,15 +19,18 @@ class TerminalBase(BaseModel):
     coord_y: float
 
 
-class TerminalCreate(TerminalBase):
-    pass
+class TerminalCreate(BaseModel):
+    # available_slots is derived from the bookings, never set by clients
+    name: str
+    max_slots: int
+    coord_x: float
+    coord_y: float
 
 
 class TerminalUpdate(BaseModel):
     name: Optional[str] = None
     status: Optional[TerminalStatusEnum] = None
     max_slots: Optional[int] = None
-    available_slots: Optional[int] = None
     coord_x: Optional[float] = None
     coord_y: Optional[float] = None
 
@@ -46,5 +49,5 @@ class TerminalResponse(TerminalBase):
         return str(id) if id else None
 
 
-class TerminalListResponse(ResponseBase):
+class TerminalListResponse(PaginatedResponse[TerminalResponse]):
     data: list[TerminalResponse]
\ No newline at end of file
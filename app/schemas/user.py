@@ -2,7 +2,7 @@ from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
 from enum import Enum
-from .common import ResponseBase
+from .common import ResponseBase, PaginatedResponse
 
 
 class UserRoleEnum(str, Enum):
@@ -77,5 +77,5 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
-class UserListResponse(ResponseBase):
+class UserListResponse(PaginatedResponse[UserResponse]):
     data: list[UserResponse]
\ No newline at end of file
@@ -0,0 +1,156 @@
+import threading
+from datetime import date, time, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.booking import Booking
+from ..models.terminal import Terminal, TerminalStatus
+from .bookings import ACTIVE_BOOKING_STATUSES
+from .plates import plate_index
+
+
+# Intervals are [start, end) in seconds since midnight
+_DAY_END = 24 * 60 * 60
+
+Interval = Tuple[int, int]
+
+
+def _seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _time(seconds: int) -> time:
+    # Booking times are `TIME` columns, so the end of the day is 23:59:59
+    return time.max.replace(microsecond=0) if seconds >= _DAY_END else time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class AvailabilityIndex:
+    """Per-worker index of the time ranges held by active bookings, by date and terminal.
+
+    A date is loaded from the database with one query the first time it is asked
+    for and then kept up to date by `track_booking` on every booking transition
+    made in this worker. Entries expire after `ttl` seconds so transitions made
+    by other workers show up within that bound; the exclusion constraint on
+    bookings stays the authority, a stale free window only ends in a 409.
+    Terminals without slots left are not offered at all, under the same bound.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        # date -> terminal id -> booking id -> interval
+        self._days = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._terminals = TTLCache(maxsize=1, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get_days(self, days: Sequence[date]) -> Dict[date, dict]:
+        """The loaded entries among `days`"""
+        loaded = {}
+        for day in days:
+            terminals = self._days.get(day)
+            if terminals is not None:
+                loaded[day] = terminals
+        return loaded
+
+    def store_days(self, days: Sequence[date], rows) -> Dict[date, dict]:
+        """Load `days` from their active booking rows, including days without any"""
+        loaded: Dict[date, Dict[UUID, Dict[UUID, Interval]]] = {day: {} for day in days}
+        for row in rows:
+            loaded[row.date].setdefault(row.terminal_id, {})[row.id] = (_seconds(row.start_time), _seconds(row.end_time))
+        for day, terminals in loaded.items():
+            self._days.set(day, terminals)
+        return loaded
+
+    def active_terminals(self) -> Optional[List[Tuple[UUID, str]]]:
+        return self._terminals.get("active")
+
+    def store_active_terminals(self, terminals: List[Tuple[UUID, str]]):
+        self._terminals.set("active", terminals)
+
+    def invalidate_terminals(self):
+        self._terminals.clear()
+
+    def track(self, booking: Booking):
+        """Record `booking`'s current status; dates that are not loaded are skipped"""
+        terminals = self._days.get(booking.date)
+        if terminals is None:
+            return
+        # Freshly created bookings still hold the ids as the request passed them
+        terminal_id, booking_id = UUID(str(booking.terminal_id)), UUID(str(booking.id))
+        with self._lock:
+            bookings = terminals.setdefault(terminal_id, {})
+            if booking.status in ACTIVE_BOOKING_STATUSES:
+                bookings[booking_id] = (_seconds(booking.start_time), _seconds(booking.end_time))
+            else:
+                bookings.pop(booking_id, None)
+
+    def free_windows(self, terminals: dict, terminal_id: UUID, min_seconds: int) -> List[Interval]:
+        """Maximal free intervals of at least `min_seconds` in a date entry from `get_days`"""
+        with self._lock:
+            busy = sorted(terminals.get(terminal_id, {}).values())
+        windows, cursor = [], 0
+        for start, end in busy + [(_DAY_END, _DAY_END)]:
+            if start - cursor >= min_seconds:
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        return windows
+
+
+availability_index = AvailabilityIndex(
+    maxsize=settings.AVAILABILITY_INDEX_MAX_DAYS,
+    ttl=settings.AVAILABILITY_INDEX_TTL_SECONDS,
+)
+
+
+def track_booking(booking: Booking):
+    """Keep the availability and plate indexes in step with a committed booking change"""
+    availability_index.track(booking)
+    plate_index.track(booking)
+
+
+async def find_free_windows(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    duration: timedelta,
+    terminal_id: Optional[UUID] = None,
+) -> List[dict]:
+    """Free windows of at least `duration` per active terminal with slots left and date, served from the index"""
+    days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+
+    terminals = availability_index.active_terminals()
+    if terminals is None:
+        # A terminal whose counter is exhausted would refuse any window with a 409
+        rows = await db.execute(
+            select(Terminal.id, Terminal.name)
+            .where(Terminal.status == TerminalStatus.ACTIVE, Terminal.available_slots > 0)
+            .order_by(Terminal.name, Terminal.id)
+        )
+        terminals = [(row.id, row.name) for row in rows]
+        availability_index.store_active_terminals(terminals)
+
+    loaded = availability_index.get_days(days)
+    missing = [day for day in days if day not in loaded]
+    if missing:
+        rows = await db.execute(
+            select(Booking.id, Booking.terminal_id, Booking.date, Booking.start_time, Booking.end_time)
+            .where(Booking.date.in_(missing), Booking.status.in_(ACTIVE_BOOKING_STATUSES))
+        )
+        loaded.update(availability_index.store_days(missing, rows))
+
+    min_seconds = int(duration.total_seconds())
+    results = []
+    for day in days:
+        for terminal, name in terminals:
+            if terminal_id and terminal != terminal_id:
+                continue
+            windows = availability_index.free_windows(loaded[day], terminal, min_seconds)
+            if windows:
+                results.append({
+                    "terminal_id": str(terminal),
+                    "terminal_name": name,
+                    "date": day,
+                    "windows": [{"start_time": _time(start), "end_time": _time(end)} for start, end in windows],
+                })
+    return results
@@ -0,0 +1,291 @@
+import uuid
+from collections import Counter
+from datetime import timedelta
+from typing import List, Sequence
+from uuid import UUID
+from sqlalchemy import Date, Integer, Text, Time, column, delete, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.clock import terminal_today
+from ..models.booking import Booking, BookingStatus
+from ..models.notification import Notification, NotificationType
+from ..models.terminal import Terminal
+from .availability import availability_index, track_booking
+from .booking_queue import claim_available
+from .bookings import ACTIVE_BOOKING_STATUSES
+from .gate import issue_qr_payloads
+from .slots import hold_slots_async, release_slots_async
+
+
+def expand_recurrence(recurrence) -> List[dict]:
+    """Slots for every matching weekday of a `BookingRecurrence`"""
+    # Only the matching days are visited, and never past date_to, which may be date.max
+    span = (recurrence.date_to - recurrence.date_from).days
+    first = recurrence.date_from.weekday()
+    offsets = sorted(
+        offset
+        for weekday in set(recurrence.weekdays)
+        for offset in range((weekday - first) % 7, span + 1, 7)
+    )
+    return [
+        {
+            "terminal_id": recurrence.terminal_id,
+            "date": recurrence.date_from + timedelta(days=offset),
+            "start_time": recurrence.start_time,
+            "end_time": recurrence.end_time,
+        }
+        for offset in offsets
+    ]
+
+
+def overlapping_query(items: Sequence[dict]):
+    """Select the indexes of `items` overlapping an active booking, with one VALUES join"""
+    requested = values(
+        column("idx", Integer),
+        column("terminal_id", PostgresUUID(as_uuid=True)),
+        column("date", Date),
+        column("start_time", Time),
+        column("end_time", Time),
+        name="requested",
+    ).data([
+        (item["index"], item["terminal_id"], item["date"], item["start_time"], item["end_time"])
+        for item in items
+    ])
+    # Probes the slot exclusion constraint's GiST index
+    return (
+        select(requested.c.idx)
+        .distinct()
+        .join(Booking, Booking.terminal_id == requested.c.terminal_id)
+        .where(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            Booking.slot.overlaps(func.tsrange(
+                requested.c.date + requested.c.start_time,
+                requested.c.date + requested.c.end_time,
+                "[)",
+            )),
+        )
+    )
+
+
+async def _find_overlapping(db: AsyncSession, items: Sequence[dict]) -> set:
+    """Indexes of `items` overlapping an active booking"""
+    return set((await db.scalars(overlapping_query(items))).all())
+
+
+def _overlaps_earlier(item: dict, accepted: Sequence[dict]) -> bool:
+    return any(
+        other["terminal_id"] == item["terminal_id"]
+        and other["date"] == item["date"]
+        and other["start_time"] < item["end_time"]
+        and other["end_time"] > item["start_time"]
+        for other in accepted
+    )
+
+
+async def create_bookings(db: AsyncSession, carrier_user_id: UUID, slots: Sequence[dict]) -> List[dict]:
+    """Create PENDING bookings for `slots` in one transaction, returning a result per slot.
+
+    Overlaps are checked for the whole batch in one query, the rows go in with
+    a single multi-row INSERT and terminal capacity is then taken with one
+    counter update per terminal; rows left without a slot are deleted again.
+    The INSERT skips rows the exclusion constraint rejects, so a concurrent
+    booking that wins a slot after the check only marks that item as a
+    conflict instead of failing the batch.
+    """
+    today = terminal_today()
+    results, candidates = [], []
+    for index, slot in enumerate(slots):
+        result = {"index": index, **slot, "terminal_id": str(slot["terminal_id"]), "outcome": None}
+        results.append(result)
+        try:
+            terminal_id = UUID(str(slot["terminal_id"]))
+        except ValueError:
+            result.update(outcome="INVALID", detail="Invalid terminal_id format")
+            continue
+        if slot["end_time"] <= slot["start_time"]:
+            result.update(outcome="INVALID", detail="end_time must be after start_time")
+        elif slot["date"] < today:
+            result.update(outcome="INVALID", detail="date is in the past")
+        elif _overlaps_earlier({**slot, "terminal_id": terminal_id}, candidates):
+            result.update(outcome="CONFLICT", detail="Overlaps an earlier slot in this batch")
+        else:
+            candidates.append({**slot, "index": index, "terminal_id": terminal_id})
+
+    if candidates:
+        overlapping = await _find_overlapping(db, candidates)
+        for item in candidates:
+            if item["index"] in overlapping:
+                results[item["index"]].update(outcome="CONFLICT", detail="Time slot already booked at this terminal")
+        candidates = [item for item in candidates if item["index"] not in overlapping]
+
+    if candidates:
+        # The multi-row INSERT fails as a whole on a missing terminal, so those are weeded out first
+        known = set((await db.scalars(
+            select(Terminal.id).where(Terminal.id.in_({item["terminal_id"] for item in candidates}))
+        )).all())
+        for item in candidates:
+            if item["terminal_id"] not in known:
+                results[item["index"]].update(outcome="INVALID", detail="Terminal not found")
+        candidates = [item for item in candidates if item["terminal_id"] in known]
+
+    # Rows go in before their slots are held, so booking rows are locked before
+    # terminal rows as in every other path
+    inserted = []
+    if candidates:
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "carrier_user_id": carrier_user_id,
+                "terminal_id": item["terminal_id"],
+                "date": item["date"],
+                "start_time": item["start_time"],
+                "end_time": item["end_time"],
+                "status": BookingStatus.PENDING,
+            }
+            for item in candidates
+        ]
+        by_id = {booking.id: booking for booking in (await db.execute(
+            insert(Booking)
+            .values(rows)
+            .on_conflict_do_nothing()
+            .returning(*Booking.__table__.columns)
+        )).all()}
+        for item, row in zip(candidates, rows):
+            booking = by_id.get(row["id"])
+            if booking is None:
+                results[item["index"]].update(outcome="CONFLICT", detail="Time slot already booked at this terminal")
+            else:
+                inserted.append((item, booking))
+
+    # Terminal capacity goes to the earliest slots of the batch; terminals are
+    # locked in id order so concurrent batches cannot deadlock on each other
+    granted = {}
+    for terminal_id, wanted in sorted(Counter(item["terminal_id"] for item, _ in inserted).items()):
+        granted[terminal_id] = await hold_slots_async(db, terminal_id, wanted) or 0
+    unplaced = []
+    for item, booking in inserted:
+        if granted[item["terminal_id"]]:
+            granted[item["terminal_id"]] -= 1
+            results[item["index"]].update(outcome="CREATED", booking=booking)
+        else:
+            unplaced.append(booking.id)
+            results[item["index"]].update(outcome="NO_SLOTS", detail="No slots left at this terminal")
+    if unplaced:
+        await db.execute(
+            delete(Booking).where(Booking.id.in_(unplaced)).execution_options(synchronize_session=False)
+        )
+        availability_index.invalidate_terminals()
+
+    await db.commit()
+    for result in results:
+        if result.get("booking") is not None:
+            track_booking(result["booking"])
+    return results
+
+
+# Statuses an operator decision may move a PENDING booking to
+DECISION_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.REJECTED)
+
+
+async def decide_bookings(db: AsyncSession, operator, decisions: Sequence[dict]) -> List[dict]:
+    """Confirm or reject many PENDING bookings of the operator's terminal in one transaction.
+
+    The status changes, decider and QR payloads go in with one UPDATE ... FROM
+    VALUES guarded by `status = PENDING` and the claim leases, so a booking
+    decided or claimed by another operator is reported instead of being
+    overwritten. Carrier notifications go in with one multi-row INSERT.
+    """
+    results, requested, seen = [], [], set()
+    for index, decision in enumerate(decisions):
+        result = {"index": index, "booking_id": str(decision["booking_id"]), "outcome": None}
+        results.append(result)
+        try:
+            booking_id = UUID(str(decision["booking_id"]))
+        except ValueError:
+            result.update(outcome="INVALID", detail="Invalid booking_id format")
+            continue
+        status = BookingStatus(decision["status"])
+        if status not in DECISION_STATUSES:
+            result.update(outcome="INVALID", detail="Decision must be CONFIRMED or REJECTED")
+        elif booking_id in seen:
+            result.update(outcome="INVALID", detail="Booking decided twice in this batch")
+        else:
+            seen.add(booking_id)
+            requested.append((index, booking_id, status))
+
+    if requested:
+        # Gate QR codes are signed up front and stored by the same UPDATE
+        payloads = await issue_qr_payloads(
+            db, [booking_id for _, booking_id, status in requested if status == BookingStatus.CONFIRMED]
+        )
+        decided = values(
+            column("id", PostgresUUID(as_uuid=True)),
+            column("status", Booking.status.type),
+            column("qr_payload", Text),
+            name="decided",
+        ).data([
+            (booking_id, status, payloads.get(str(booking_id)) if status == BookingStatus.CONFIRMED else None)
+            for _, booking_id, status in requested
+        ])
+        rows = (await db.execute(
+            update(Booking)
+            .where(
+                Booking.id == decided.c.id,
+                Booking.terminal_id == operator.terminal_id,
+                Booking.status == BookingStatus.PENDING,
+                claim_available(operator.id),
+            )
+            .values(
+                status=decided.c.status,
+                qr_payload=decided.c.qr_payload,
+                decided_by_operator_user_id=operator.id,
+                claimed_by_operator_user_id=None,
+                claimed_until=None,
+            )
+            .returning(*Booking.__table__.columns, (Booking.date >= terminal_today()).label("counts"))
+            .execution_options(synchronize_session=False)
+        )).all()
+        by_id = {row.id: row for row in rows}
+
+        # Tell apart bookings that do not exist here, were already decided or are claimed
+        missing = [booking_id for _, booking_id, _ in requested if booking_id not in by_id]
+        existing = {}
+        if missing:
+            existing = {row.id: row for row in await db.execute(
+                select(Booking.id, Booking.status)
+                .where(Booking.id.in_(missing), Booking.terminal_id == operator.terminal_id)
+            )}
+
+        for index, booking_id, status in requested:
+            booking = by_id.get(booking_id)
+            if booking is not None:
+                results[index].update(outcome="DECIDED", booking=booking)
+            elif booking_id not in existing:
+                results[index].update(outcome="NOT_FOUND", detail="Booking not found at this terminal")
+            elif existing[booking_id].status == BookingStatus.PENDING:
+                results[index].update(outcome="CLAIMED", detail="Booking is claimed by another operator")
+            else:
+                results[index].update(outcome="NOT_PENDING", detail="Booking was already decided")
+
+        # Rejections free their slot; confirmations keep the one taken at creation
+        released = sum(1 for row in rows if row.status == BookingStatus.REJECTED and row.counts)
+        if released:
+            await release_slots_async(db, operator.terminal_id, released)
+
+        if rows:
+            await db.execute(insert(Notification).values([
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": row.carrier_user_id,
+                    "type": NotificationType.BOOKING_CONFIRMED,
+                    "message": f"Your booking for {row.date} has been {row.status.value}",
+                    "related_booking_id": row.id,
+                }
+                for row in rows
+            ]))
+
+    await db.commit()
+    for result in results:
+        if result.get("booking") is not None:
+            track_booking(result["booking"])
+    return results
@@ -0,0 +1,50 @@
+import csv
+import io
+from typing import Iterator, Optional, Tuple
+from ..core.config import settings
+from ..core.database import SyncSessionLocal
+from ..schemas.booking import BookingExportFormatEnum, BookingResponse
+from ..utils.pagination import list_adapter, sparse_model
+
+
+# Response media type of each export format
+EXPORT_MEDIA_TYPES = {
+    BookingExportFormatEnum.NDJSON: "application/x-ndjson",
+    BookingExportFormatEnum.CSV: "text/csv",
+}
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def export_bookings(
+    statement,
+    export_format: BookingExportFormatEnum,
+    fields: Optional[Tuple[str, ...]] = None
+) -> Iterator[bytes]:
+    """Stream the bookings selected by `statement` as NDJSON or CSV, one chunk per fetched batch.
+
+    Rows come through a server-side cursor `EXPORT_BATCH_SIZE` at a time, so
+    memory stays flat whatever the export covers. The generator opens its own
+    session: the body is produced after the request's dependencies are gone.
+    """
+    model = sparse_model(BookingResponse, fields) if fields else BookingResponse
+    adapter = list_adapter(model)
+    names = list(model.model_fields)
+
+    if export_format == BookingExportFormatEnum.CSV:
+        yield _csv_chunk([names])
+
+    with SyncSessionLocal() as db:
+        result = db.execute(statement.execution_options(stream_results=True, yield_per=settings.EXPORT_BATCH_SIZE))
+        for rows in result.scalars().partitions():
+            bookings = adapter.validate_python(rows, from_attributes=True)
+            if export_format == BookingExportFormatEnum.CSV:
+                yield _csv_chunk(
+                    [row[name] for name in names] for row in adapter.dump_python(bookings, mode="json")
+                )
+            else:
+                yield b"".join(booking.__pydantic_serializer__.to_json(booking) + b"\n" for booking in bookings)
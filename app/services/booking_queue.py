@@ -0,0 +1,59 @@
+from datetime import timedelta
+from typing import List
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.booking import Booking, BookingStatus
+from .bookings import BOOKING_PAGE_ORDER
+
+
+def claim_available(operator_id):
+    """Bookings no other operator holds an unexpired claim on"""
+    return or_(
+        Booking.claimed_by_operator_user_id.is_(None),
+        Booking.claimed_by_operator_user_id == operator_id,
+        Booking.claimed_until < func.current_timestamp(),
+    )
+
+
+def claimable_query(terminal_id, operator_id, limit: int):
+    """The next `limit` PENDING bookings of a terminal the operator may claim, oldest slot first"""
+    return (
+        select(Booking.id)
+        .where(
+            Booking.terminal_id == terminal_id,
+            Booking.status == BookingStatus.PENDING,
+            claim_available(operator_id),
+        )
+        .order_by(*BOOKING_PAGE_ORDER)
+        .limit(limit)
+    )
+
+
+async def claim_pending_bookings(db: AsyncSession, operator, limit: int) -> List:
+    """Lease the next `limit` unclaimed PENDING bookings of the operator's terminal.
+
+    Rows locked by another operator's concurrent claim are skipped rather than
+    waited on, so any number of operators can drain the same queue in parallel
+    without being handed the same booking. Claiming again renews the lease on
+    bookings the operator already holds.
+    """
+    lease = timedelta(seconds=settings.BOOKING_CLAIM_LEASE_SECONDS)
+    claimable = (
+        claimable_query(operator.terminal_id, operator.id, limit)
+        .with_for_update(skip_locked=True)
+        .cte("claimable")
+    )
+    rows = (await db.execute(
+        update(Booking)
+        .where(Booking.id == claimable.c.id)
+        .values(
+            claimed_by_operator_user_id=operator.id,
+            claimed_until=func.current_timestamp() + lease,
+        )
+        .returning(*Booking.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )).all()
+    await db.commit()
+    # RETURNING does not keep the queue order
+    return sorted(rows, key=lambda row: (row.date, row.start_time, row.id))
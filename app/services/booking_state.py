@@ -0,0 +1,98 @@
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.clock import terminal_today
+from ..models.booking import Booking, BookingStatus
+from ..models.terminal import Terminal
+from .bookings import ACTIVE_BOOKING_STATUSES
+
+
+# Legal moves of the booking lifecycle; every other status change is refused
+TRANSITIONS = {
+    BookingStatus.PENDING: (BookingStatus.CONFIRMED, BookingStatus.REJECTED, BookingStatus.CANCELLED),
+    BookingStatus.CONFIRMED: (BookingStatus.CONSUMED,),
+}
+
+
+def can_transition(from_status: BookingStatus, to_status: BookingStatus) -> bool:
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def _sources(to_status: BookingStatus):
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def _transition_statement(booking_id, to_status: BookingStatus, guards, values: dict):
+    moved = (
+        update(Booking)
+        .where(Booking.id == booking_id, Booking.status.in_(_sources(to_status)), *guards)
+        .values(status=to_status, updated_at=func.current_timestamp(), **values)
+        .returning(*Booking.__table__.columns)
+        .cte("moved")
+    )
+    query = select(moved)
+    if to_status not in ACTIVE_BOOKING_STATUSES:
+        # Leaving an active status frees the terminal slot in the same statement
+        released = (
+            update(Terminal)
+            .where(
+                Terminal.id == moved.c.terminal_id,
+                moved.c.date >= terminal_today(),
+                Terminal.available_slots < Terminal.max_slots,
+            )
+            .values(available_slots=Terminal.available_slots + 1)
+            .cte("released")
+        )
+        query = query.add_cte(released)
+    return query
+
+
+async def transition(db: AsyncSession, booking_id, to_status: BookingStatus, *guards, **values):
+    """Move a booking to `to_status` with one compare-and-set UPDATE.
+
+    The row only changes if its current status may legally move to `to_status`
+    and every extra `guards` condition holds; `values` are written alongside.
+    Returns the updated row, or None when nothing matched, in which case the
+    caller loads the booking to tell the client why. Nothing is committed.
+    """
+    result = await db.execute(
+        _transition_statement(booking_id, to_status, guards, values),
+        execution_options={"synchronize_session": False},
+    )
+    return result.first()
+
+
+async def assign_driver(db: AsyncSession, booking_id, driver_id: UUID, carrier_user_id: UUID, **values):
+    """Attach a driver to an unassigned CONFIRMED booking of their carrier; None when that fails"""
+    result = await db.execute(
+        update(Booking)
+        .where(
+            Booking.id == booking_id,
+            Booking.status == BookingStatus.CONFIRMED,
+            Booking.driver_user_id.is_(None),
+            Booking.carrier_user_id == carrier_user_id,
+        )
+        .values(driver_user_id=driver_id, updated_at=func.current_timestamp(), **values)
+        .returning(*Booking.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first()
+
+
+async def update_fields(db: AsyncSession, booking_id, *guards, **values):
+    """Write non-status booking fields with one guarded UPDATE; None when nothing matched"""
+    result = await db.execute(
+        update(Booking)
+        .where(Booking.id == booking_id, *guards)
+        .values(updated_at=func.current_timestamp(), **values)
+        .returning(*Booking.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first()
+
+
+def transition_error_detail(from_status: BookingStatus, to_status: BookingStatus) -> Optional[str]:
+    if can_transition(from_status, to_status):
+        return None
+    return f"Cannot move a {from_status.value} booking to {to_status.value}"
@@ -0,0 +1,28 @@
+from ..models.booking import Booking, BookingStatus
+from ..utils.pagination import RowBundle
+
+
+# Bookings that hold their time slot at a terminal
+ACTIVE_BOOKING_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED)
+
+# Keyset ordering shared by every booking listing
+BOOKING_PAGE_ORDER = (Booking.date, Booking.start_time, Booking.id)
+
+# Columns the booking listings serialize
+BOOKING_LIST_COLUMNS = (
+    Booking.id,
+    Booking.carrier_user_id,
+    Booking.driver_user_id,
+    Booking.terminal_id,
+    Booking.date,
+    Booking.start_time,
+    Booking.end_time,
+    Booking.status,
+    Booking.decided_by_operator_user_id,
+    Booking.qr_payload,
+    Booking.created_at,
+    Booking.updated_at,
+)
+
+# Read-only booking listings load these instead of `Booking` instances
+BOOKING_ROW = RowBundle("BookingRow", *BOOKING_LIST_COLUMNS)
@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import cast, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.clock import terminal_instant, terminal_today
+from ..core.config import settings
+from ..models.booking import Booking, BookingStatus
+from ..utils.helpers import QRPayload, generate_qr_payload, verify_qr_payload
+from .availability import track_booking
+from .booking_state import transition
+from .slots import release_slots_async
+
+
+# Why a scan was refused, with the message shown at the gate
+SCAN_REJECTIONS = {
+    "INVALID": "Invalid QR code",
+    "WRONG_TERMINAL": "QR code is for another terminal",
+    "NOT_YET_VALID": "QR code is not valid yet",
+    "EXPIRED": "QR code has expired",
+    "DUPLICATE": "Booking scanned twice in this batch",
+    "NOT_FOUND": "Booking not found",
+    "NOT_CONFIRMED": "Can only consume confirmed bookings",
+    "SUPERSEDED": "QR code was replaced by the assigned driver's",
+    "STALE": "Scan is too old to be accepted",
+}
+
+
+def _qr_key() -> bytes:
+    return (settings.QR_SIGNING_KEY or settings.SECRET_KEY).encode()
+
+
+def _window_edge(day, at, minutes: int) -> datetime:
+    # Slots are terminal wall-clock times; the payload carries UTC instants,
+    # cut at the ends of the calendar rather than overflowing there
+    try:
+        return terminal_instant(day, at) + timedelta(minutes=minutes)
+    except OverflowError:
+        edge = datetime.min if day.year == datetime.min.year else datetime.max.replace(microsecond=0)
+        return edge.replace(tzinfo=timezone.utc)
+
+
+def issue_qr_payload(booking, driver_id=None) -> str:
+    """Sign the gate QR code of `booking`, bound to `driver_id` once a driver is assigned"""
+    return generate_qr_payload(
+        _qr_key(),
+        booking.id,
+        booking.terminal_id,
+        _window_edge(booking.date, booking.start_time, -settings.QR_VALID_EARLY_MINUTES),
+        _window_edge(booking.date, booking.end_time, settings.QR_VALID_LATE_MINUTES),
+        driver_id,
+    )
+
+
+async def issue_qr_payloads(db: AsyncSession, booking_ids: Sequence, driver_id=None) -> Dict[str, str]:
+    """QR payloads for many bookings by booking id string, read with one query.
+
+    Terminal, date and times never change after creation, so the payloads can
+    be signed before the guarded update that stores them. They are bound to
+    `driver_id`, or to the driver a booking already has when it is None.
+    """
+    rows = await db.execute(
+        select(Booking.id, Booking.terminal_id, Booking.date, Booking.start_time, Booking.end_time, Booking.driver_user_id)
+        .where(Booking.id.in_(booking_ids))
+    )
+    return {str(row.id): issue_qr_payload(row, driver_id or row.driver_user_id) for row in rows}
+
+
+def check_qr_payload(payload: str, terminal_id, at: Optional[datetime] = None) -> Tuple[Optional[QRPayload], Optional[str]]:
+    """Verify a scanned payload in process; returns (QRPayload, None) or (None, a SCAN_REJECTIONS key)"""
+    qr = verify_qr_payload(_qr_key(), payload)
+    if qr is None:
+        return None, "INVALID"
+    if not terminal_id or qr.terminal_id != terminal_id:
+        return None, "WRONG_TERMINAL"
+    at = at or datetime.utcnow()
+    if at < qr.valid_from:
+        return None, "NOT_YET_VALID"
+    if at > qr.valid_until:
+        return None, "EXPIRED"
+    return qr, None
+
+
+def _driver_matches(driver_id):
+    return Booking.driver_user_id == driver_id if driver_id else Booking.driver_user_id.is_(None)
+
+
+async def consume_at_gate(db: AsyncSession, qr: QRPayload):
+    """Consume the booking of a verified QR code with one conditional UPDATE; None when refused.
+
+    A payload signed before a driver was assigned stops working once one is,
+    and the payload bound to that driver is the only one accepted after that.
+    """
+    return await transition(
+        db,
+        qr.booking_id,
+        BookingStatus.CONSUMED,
+        Booking.terminal_id == qr.terminal_id,
+        _driver_matches(qr.driver_id),
+    )
+
+
+async def refusal_reason(db: AsyncSession, qr: QRPayload) -> str:
+    """The SCAN_REJECTIONS key explaining why `consume_at_gate` refused a verified payload"""
+    booking = await db.get(Booking, qr.booking_id)
+    if not booking:
+        return "NOT_FOUND"
+    if booking.status != BookingStatus.CONFIRMED:
+        return "NOT_CONFIRMED"
+    return "SUPERSEDED"
+
+
+def _scan_time(scanned_at: Optional[datetime], now: datetime) -> Optional[datetime]:
+    # Buffered scans are judged at the moment they were taken, never in the
+    # future, and a client-supplied time cannot reach back past the maximum age
+    if scanned_at is None:
+        return now
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if scanned_at < now - timedelta(minutes=settings.GATE_MAX_SCAN_AGE_MINUTES):
+        return None
+    return min(scanned_at, now)
+
+
+async def consume_scans(db: AsyncSession, operator, scans: Sequence[dict]) -> List[dict]:
+    """Verify many scanned payloads and consume every valid one in one transaction.
+
+    Signatures and time windows are checked in process; the accepted bookings
+    are consumed with one UPDATE ... FROM VALUES guarded by status and driver,
+    and only the scans it refuses are looked up to report why.
+    """
+    now = datetime.utcnow()
+    results, accepted, seen = [], [], set()
+    for index, scan in enumerate(scans):
+        result = {"index": index, "booking_id": None, "outcome": "ACCEPTED"}
+        results.append(result)
+        scanned_at = _scan_time(scan.get("scanned_at"), now)
+        if scanned_at is None:
+            qr, reason = None, "STALE"
+        else:
+            qr, reason = check_qr_payload(scan["qr_payload"], operator.terminal_id, scanned_at)
+        if qr is not None:
+            result["booking_id"] = str(qr.booking_id)
+            if qr.booking_id in seen:
+                reason = "DUPLICATE"
+            else:
+                seen.add(qr.booking_id)
+                accepted.append((index, qr))
+        if reason:
+            result.update(outcome=reason, detail=SCAN_REJECTIONS[reason])
+
+    if accepted:
+        scanned = values(
+            column("id", PostgresUUID(as_uuid=True)),
+            column("driver_id", PostgresUUID(as_uuid=True)),
+            name="scanned",
+        ).data([(qr.booking_id, qr.driver_id) for _, qr in accepted])
+        rows = (await db.execute(
+            update(Booking)
+            .where(
+                Booking.id == scanned.c.id,
+                Booking.terminal_id == operator.terminal_id,
+                Booking.status == BookingStatus.CONFIRMED,
+                # An all-NULL VALUES column comes out as text, hence the cast
+                Booking.driver_user_id.is_not_distinct_from(cast(scanned.c.driver_id, PostgresUUID(as_uuid=True))),
+            )
+            .values(status=BookingStatus.CONSUMED, updated_at=func.current_timestamp())
+            .returning(*Booking.__table__.columns, (Booking.date >= terminal_today()).label("counts"))
+            .execution_options(synchronize_session=False)
+        )).all()
+        by_id = {row.id: row for row in rows}
+
+        # Tell apart bookings that do not exist here, are not confirmed or were re-signed
+        missing = [qr.booking_id for _, qr in accepted if qr.booking_id not in by_id]
+        existing = {}
+        if missing:
+            existing = {row.id: row for row in await db.execute(
+                select(Booking.id, Booking.status)
+                .where(Booking.id.in_(missing), Booking.terminal_id == operator.terminal_id)
+            )}
+
+        for index, qr in accepted:
+            booking = by_id.get(qr.booking_id)
+            if booking is not None:
+                results[index]["booking"] = booking
+                continue
+            if qr.booking_id not in existing:
+                reason = "NOT_FOUND"
+            elif existing[qr.booking_id].status != BookingStatus.CONFIRMED:
+                reason = "NOT_CONFIRMED"
+            else:
+                reason = "SUPERSEDED"
+            results[index].update(outcome=reason, detail=SCAN_REJECTIONS[reason])
+
+        # Consumed bookings no longer hold their slot
+        released = sum(1 for row in rows if row.counts)
+        if released:
+            await release_slots_async(db, operator.terminal_id, released)
+
+    await db.commit()
+    for result in results:
+        if result.get("booking") is not None:
+            track_booking(result["booking"])
+    return results
@@ -0,0 +1,130 @@
+import threading
+from datetime import date
+from typing import List
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.cache import TTLCache
+from ..core.clock import terminal_today
+from ..core.config import settings
+from ..models.booking import Booking, BookingStatus
+from ..models.profile import DriverProfile, plate_key
+from ..utils.helpers import normalize_plate
+
+
+class PlateIndex:
+    """Per-worker index of a terminal's CONFIRMED bookings of the day by normalized truck plate.
+
+    A terminal's day is loaded with one query on the first lookup, then kept up
+    to date by `track` on every booking change made in this worker. A booking
+    assigned to a driver the entry does not know yet drops the entry so the
+    next lookup reloads it; entries expire after `ttl` seconds to pick up
+    changes made by other workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        # (terminal id, date) -> {"plates": plate -> driver id -> driver,
+        #                         "drivers": driver id -> driver, "bookings": booking id -> driver id}
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, terminal_id: UUID, day: date):
+        return self._entries.get((terminal_id, day))
+
+    def store(self, terminal_id: UUID, day: date, rows) -> dict:
+        """Load a terminal's day from its CONFIRMED booking rows carrying their driver's name and plate"""
+        entry = {"plates": {}, "drivers": {}, "bookings": {}}
+        for row in rows:
+            driver = entry["drivers"].get(row.driver_user_id)
+            if driver is None:
+                driver = {
+                    "driver_user_id": str(row.driver_user_id),
+                    "first_name": row.first_name,
+                    "last_name": row.last_name,
+                    "truck_plate": row.truck_plate,
+                    "plate": normalize_plate(row.truck_plate or ""),
+                    "bookings": {},
+                }
+                entry["drivers"][row.driver_user_id] = driver
+                # Drivers without a plate are kept for `track` but cannot be looked up
+                if driver["plate"]:
+                    entry["plates"].setdefault(driver["plate"], {})[row.driver_user_id] = driver
+            driver["bookings"][row.id] = row
+            entry["bookings"][row.id] = row.driver_user_id
+        self._entries.set((terminal_id, day), entry)
+        return entry
+
+    def lookup(self, entry: dict, plate: str) -> List[dict]:
+        """Drivers with `plate` in an entry from `get`, each with their bookings sorted by start time"""
+        with self._lock:
+            drivers = list(entry["plates"].get(plate, {}).values())
+            return [
+                {**driver, "bookings": sorted(driver["bookings"].values(), key=lambda booking: booking.start_time)}
+                for driver in drivers
+            ]
+
+    def track(self, booking: Booking):
+        """Record `booking`'s current status and driver; entries that are not loaded are skipped"""
+        terminal_id = UUID(str(booking.terminal_id))
+        entry = self._entries.get((terminal_id, booking.date))
+        if entry is None:
+            return
+        booking_id = UUID(str(booking.id))
+        driver_id = UUID(str(booking.driver_user_id)) if booking.driver_user_id else None
+        with self._lock:
+            previous = entry["bookings"].pop(booking_id, None)
+            if previous is not None:
+                entry["drivers"][previous]["bookings"].pop(booking_id, None)
+            if booking.status != BookingStatus.CONFIRMED or driver_id is None:
+                return
+            driver = entry["drivers"].get(driver_id)
+            if driver is None:
+                # The plate of a newly seen driver is not known here
+                self._entries.delete((terminal_id, booking.date))
+                return
+            driver["bookings"][booking_id] = booking
+            entry["bookings"][booking_id] = driver_id
+
+
+plate_index = PlateIndex(maxsize=settings.PLATE_INDEX_MAX_TERMINALS, ttl=settings.PLATE_INDEX_TTL_SECONDS)
+
+
+async def find_by_plate(db: AsyncSession, terminal_id: UUID, plate: str) -> List[dict]:
+    """Drivers with `plate` and their CONFIRMED bookings of today at the terminal, served from the index.
+
+    A plate with no booking today still resolves to its drivers, through the
+    plate expression index, so the gate can tell an unknown truck from an
+    unbooked one.
+    """
+    plate = normalize_plate(plate)
+    if not plate:
+        return []
+    today = terminal_today()
+    entry = plate_index.get(terminal_id, today)
+    if entry is None:
+        rows = await db.execute(
+            select(*Booking.__table__.columns, DriverProfile.first_name, DriverProfile.last_name, DriverProfile.truck_plate)
+            .join(DriverProfile, DriverProfile.user_id == Booking.driver_user_id)
+            .where(
+                Booking.terminal_id == terminal_id,
+                Booking.date == today,
+                Booking.status == BookingStatus.CONFIRMED,
+            )
+        )
+        entry = plate_index.store(terminal_id, today, rows)
+
+    drivers = plate_index.lookup(entry, plate)
+    if drivers:
+        return drivers
+    profiles = await db.scalars(select(DriverProfile).where(plate_key(DriverProfile.truck_plate) == plate))
+    return [
+        {
+            "driver_user_id": str(profile.user_id),
+            "first_name": profile.first_name,
+            "last_name": profile.last_name,
+            "truck_plate": profile.truck_plate,
+            "plate": plate,
+            "bookings": [],
+        }
+        for profile in profiles
+    ]
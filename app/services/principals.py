@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..core.cache import TTLCache
+from ..core.config import settings
+from ..models.user import User, UserRole
+from ..models.profile import OperatorProfile, CarrierProfile, DriverProfile, CarrierStatus
+from ..models.token_version import UserTokenVersion
+from .token_versions import token_versions
+
+
+@dataclass(frozen=True)
+class Principal:
+    """What authorization needs to know about the authenticated user"""
+    id: UUID
+    role: UserRole
+    is_active: bool
+    terminal_id: Optional[UUID] = None  # Operators: assigned terminal
+    carrier_user_id: Optional[UUID] = None  # Drivers: employing carrier
+    carrier_status: Optional[CarrierStatus] = None  # Carriers: approval status
+    token_version: int = 0  # Access tokens carrying an older version are revoked
+
+
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _principal_query(user_id: UUID):
+    # One round trip: the user's columns plus the role context from whichever profile exists
+    return (
+        select(
+            User.id,
+            User.role,
+            User.is_active,
+            OperatorProfile.terminal_id,
+            DriverProfile.carrier_user_id,
+            CarrierProfile.status,
+            UserTokenVersion.version,
+        )
+        .outerjoin(OperatorProfile, OperatorProfile.user_id == User.id)
+        .outerjoin(DriverProfile, DriverProfile.user_id == User.id)
+        .outerjoin(CarrierProfile, CarrierProfile.user_id == User.id)
+        .outerjoin(UserTokenVersion, UserTokenVersion.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+
+def _principal_from_row(row) -> Optional[Principal]:
+    if row is None:
+        return None
+    return Principal(
+        id=row.id,
+        role=row.role,
+        is_active=bool(row.is_active),
+        terminal_id=row.terminal_id,
+        carrier_user_id=row.carrier_user_id,
+        carrier_status=row.status,
+        token_version=row.version or 0,
+    )
+
+
+def get_principal(db: Session, user_id: UUID) -> Optional[Principal]:
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = _principal_from_row(db.execute(_principal_query(user_id)).first())
+        if principal is not None:
+            principal_cache.set(user_id, principal)
+    return principal
+
+
+async def get_principal_async(db: AsyncSession, user_id: UUID, use_cache: bool = True) -> Optional[Principal]:
+    """`use_cache=False` always reads the database, e.g. before signing claims into a token"""
+    principal = principal_cache.get(user_id) if use_cache else None
+    if principal is None:
+        principal = _principal_from_row((await db.execute(_principal_query(user_id))).first())
+        if principal is not None:
+            principal_cache.set(user_id, principal)
+    return principal
+
+
+def invalidate_principal(user_id, token_version: Optional[int] = None):
+    """Drop a cached principal after its role, active flag or role context changed.
+
+    Pass the version returned by `bump_token_version` so this worker rejects the
+    user's outstanding access tokens immediately rather than at its next reload.
+    """
+    user_id = user_id if isinstance(user_id, UUID) else UUID(str(user_id))
+    principal_cache.delete(user_id)
+    if token_version is not None:
+        token_versions.set(user_id, token_version)
+
+
+def principal_claims(principal: Principal) -> dict:
+    """Signed access token claims from which `principal_from_claims` rebuilds the principal"""
+    claims = {"role": principal.role.value, "ver": principal.token_version}
+    if principal.terminal_id:
+        claims["tid"] = str(principal.terminal_id)
+    if principal.carrier_user_id:
+        claims["cid"] = str(principal.carrier_user_id)
+    if principal.carrier_status:
+        claims["cst"] = principal.carrier_status.value
+    return claims
+
+
+def principal_from_claims(payload: dict) -> Optional[Principal]:
+    """Rebuild the principal from a decoded token, or None when it carries no role claims.
+
+    Deactivation bumps the token version, so a token that is still current is active.
+    """
+    if "role" not in payload or "ver" not in payload:
+        return None
+    return Principal(
+        id=UUID(payload["sub"]),
+        role=UserRole(payload["role"]),
+        is_active=True,
+        terminal_id=UUID(payload["tid"]) if payload.get("tid") else None,
+        carrier_user_id=UUID(payload["cid"]) if payload.get("cid") else None,
+        carrier_status=CarrierStatus(payload["cst"]) if payload.get("cst") else None,
+        token_version=int(payload["ver"]),
+    )
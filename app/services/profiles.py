@@ -0,0 +1,158 @@
+from typing import Optional, Sequence
+from sqlalchemy import String, and_, case, cast, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import joinedload
+from ..models.profile import CarrierProfile, DriverProfile, OperatorProfile
+from ..models.user import User, UserRole
+from ..utils.pagination import RowBundle
+
+
+# Role profile relationships on User, keyed by the role that owns them
+PROFILE_RELATIONSHIPS = {
+    UserRole.OPERATOR: User.operator_profile,
+    UserRole.CARRIER: User.carrier_profile,
+    UserRole.DRIVER: User.driver_profile,
+}
+
+
+def joined_profiles() -> list:
+    """Loader options for single-user lookups: profiles are joined into the same query"""
+    return [joinedload(relationship) for relationship in PROFILE_RELATIONSHIPS.values()]
+
+
+def serialize_profile(user: User) -> Optional[dict]:
+    """Serialize the role profile of a user whose profiles have been loaded"""
+    if user.role == UserRole.OPERATOR:
+        profile = user.operator_profile
+        if profile:
+            return {
+                "first_name": profile.first_name,
+                "last_name": profile.last_name,
+                "phone": profile.phone,
+                "gender": profile.gender,
+                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
+                "terminal_id": str(profile.terminal_id) if profile.terminal_id else None
+            }
+    elif user.role == UserRole.CARRIER:
+        profile = user.carrier_profile
+        if profile:
+            return {
+                "first_name": profile.first_name,
+                "last_name": profile.last_name,
+                "phone": profile.phone,
+                "gender": profile.gender,
+                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
+                "company_name": profile.company_name,
+                "status": profile.status.value
+            }
+    elif user.role == UserRole.DRIVER:
+        profile = user.driver_profile
+        if profile:
+            return {
+                "first_name": profile.first_name,
+                "last_name": profile.last_name,
+                "phone": profile.phone,
+                "gender": profile.gender,
+                "birth_date": profile.birth_date.isoformat() if profile.birth_date else None,
+                "truck_number": profile.truck_number,
+                "truck_plate": profile.truck_plate,
+                "status": profile.status.value,
+                "carrier_user_id": str(profile.carrier_user_id)
+            }
+    return None
+
+
+# How each UserResponse field is read off a User whose profiles have been loaded
+USER_FIELDS = {
+    "id": lambda user: str(user.id),
+    "email": lambda user: user.email,
+    "role": lambda user: user.role.value,
+    "is_active": lambda user: user.is_active,
+    "created_at": lambda user: user.created_at,
+    "updated_at": lambda user: user.updated_at,
+    "profile": serialize_profile,
+}
+
+
+def serialize_user(user: User, fields: Optional[Sequence[str]] = None) -> dict:
+    """Serialize a user and its role profile into the UserResponse shape, or only `fields` of it"""
+    return {name: USER_FIELDS[name](user) for name in fields or USER_FIELDS}
+
+
+
+def _profile_object(profile, **extra):
+    # Same keys as `serialize_profile`; Postgres renders dates, ids and enums as JSON strings
+    fields = {
+        "first_name": profile.first_name,
+        "last_name": profile.last_name,
+        "phone": profile.phone,
+        "gender": profile.gender,
+        "birth_date": profile.birth_date,
+        **extra,
+    }
+    return func.json_build_object(*(part for item in fields.items() for part in item))
+
+
+# A user's role profile as a JSON object, built in the listing query itself
+USER_PROFILE = type_coerce(
+    case(
+        (
+            and_(User.role == UserRole.OPERATOR, OperatorProfile.user_id.is_not(None)),
+            _profile_object(OperatorProfile, terminal_id=OperatorProfile.terminal_id),
+        ),
+        (
+            and_(User.role == UserRole.CARRIER, CarrierProfile.user_id.is_not(None)),
+            _profile_object(CarrierProfile, company_name=CarrierProfile.company_name, status=CarrierProfile.status),
+        ),
+        (
+            and_(User.role == UserRole.DRIVER, DriverProfile.user_id.is_not(None)),
+            _profile_object(
+                DriverProfile,
+                truck_number=DriverProfile.truck_number,
+                truck_plate=DriverProfile.truck_plate,
+                status=DriverProfile.status,
+                carrier_user_id=DriverProfile.carrier_user_id,
+            ),
+        ),
+    ),
+    JSON,
+).label("profile")
+
+# Read-only user listings load these instead of `User` instances and their profiles
+USER_ROW = RowBundle(
+    "UserRow",
+    cast(User.id, String).label("id"),
+    User.email,
+    User.role,
+    User.is_active,
+    User.created_at,
+    User.updated_at,
+    USER_PROFILE,
+)
+
+
+def join_profiles(query):
+    """Outer-join the role profile tables `USER_PROFILE` reads from"""
+    return (
+        query
+        .outerjoin(OperatorProfile, OperatorProfile.user_id == User.id)
+        .outerjoin(CarrierProfile, CarrierProfile.user_id == User.id)
+        .outerjoin(DriverProfile, DriverProfile.user_id == User.id)
+    )
+
+
+# Read-only carrier listings load these instead of `CarrierProfile` instances
+CARRIER_ROW = RowBundle(
+    "CarrierRow",
+    cast(CarrierProfile.user_id, String).label("user_id"),
+    CarrierProfile.first_name,
+    CarrierProfile.last_name,
+    CarrierProfile.phone,
+    CarrierProfile.gender,
+    cast(CarrierProfile.birth_date, String).label("birth_date"),
+    CarrierProfile.company_name,
+    CarrierProfile.status,
+    CarrierProfile.proof_document_url,
+    CarrierProfile.created_at,
+    CarrierProfile.updated_at,
+)
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from datetime import datetime
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.refresh_token import RefreshToken
+
+
+logger = logging.getLogger(__name__)
+
+# Every login and refresh inserts a row. Revoked rows are kept until they
+# expire so that replaying a rotated token is still detected; past
+# `expires_at` a token is refused either way and its row can go.
+
+
+async def prune_refresh_tokens(db: AsyncSession) -> int:
+    """Delete expired refresh tokens, revoked or not; returns the rows deleted"""
+    result = await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.expires_at < datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def prune_refresh_tokens_forever():
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                pruned = await prune_refresh_tokens(db)
+            if pruned:
+                logger.info("Pruned %d expired refresh tokens", pruned)
+        except Exception:
+            logger.exception("Pruning refresh tokens failed")
+        await asyncio.sleep(settings.REFRESH_TOKEN_PRUNE_INTERVAL_SECONDS)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Optional
+from sqlalchemy import case, func, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.clock import terminal_today
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.booking import Booking
+from ..models.terminal import Terminal
+from .bookings import ACTIVE_BOOKING_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+# `Terminal.available_slots` is `max_slots` minus the active bookings dated today
+# or later: one terminal-wide pool shared by every future day, not a per-day
+# capacity, so a booking for next month holds a slot today too. Every change is
+# a single conditional UPDATE on the terminal row, run in the transaction of the
+# booking transition that causes it; past-dated bookings no longer count, so
+# transitions on them leave the counter alone.
+#
+# Lock order: a transaction writes its booking rows first and the terminal rows
+# after, in terminal id order. Creation inserts the bookings before holding
+# their slots, as transitions move the booking before releasing its slot, so a
+# booking waiting on an overlapping row never holds a terminal lock meanwhile.
+
+
+def _counts(booking_date: date):
+    return literal(booking_date) >= terminal_today()
+
+
+def _hold_slot(terminal_id, booking_date: date):
+    # Matches no row only when the booking counts and the terminal is full (or missing)
+    return (
+        update(Terminal)
+        .where(
+            Terminal.id == terminal_id,
+            or_(Terminal.available_slots > 0, ~_counts(booking_date)),
+        )
+        .values(available_slots=Terminal.available_slots - case((_counts(booking_date), 1), else_=0))
+        .returning(Terminal.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _release_slot(terminal_id, booking_date: date):
+    return (
+        update(Terminal)
+        .where(
+            Terminal.id == terminal_id,
+            Terminal.available_slots < Terminal.max_slots,
+            _counts(booking_date),
+        )
+        .values(available_slots=Terminal.available_slots + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def hold_slot_async(db: AsyncSession, terminal_id, booking_date: date) -> bool:
+    """Take one slot at the terminal; False when its capacity is exhausted"""
+    return await db.scalar(_hold_slot(terminal_id, booking_date)) is not None
+
+
+async def hold_slots_async(db: AsyncSession, terminal_id, wanted: int) -> Optional[int]:
+    """Take up to `wanted` slots at once for current bookings; None when the terminal does not exist.
+
+    The whole request is one conditional UPDATE; only when fewer slots are left
+    is the row locked to hand out the remainder.
+    """
+    granted = await db.scalar(
+        update(Terminal)
+        .where(Terminal.id == terminal_id, Terminal.available_slots >= wanted)
+        .values(available_slots=Terminal.available_slots - wanted)
+        .returning(Terminal.id)
+        .execution_options(synchronize_session=False)
+    )
+    if granted is not None:
+        return wanted
+    available = await db.scalar(
+        select(Terminal.available_slots).where(Terminal.id == terminal_id).with_for_update()
+    )
+    if available is None:
+        return None
+    available = max(min(available, wanted), 0)
+    if available:
+        await db.execute(
+            update(Terminal)
+            .where(Terminal.id == terminal_id)
+            .values(available_slots=Terminal.available_slots - available)
+            .execution_options(synchronize_session=False)
+        )
+    return available
+
+
+async def release_slots_async(db: AsyncSession, terminal_id, count: int):
+    """Give back slots taken with `hold_slots_async` that ended up unused"""
+    await db.execute(
+        update(Terminal)
+        .where(Terminal.id == terminal_id)
+        .values(available_slots=func.least(Terminal.available_slots + count, Terminal.max_slots))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def reconcile_available_slots(db: AsyncSession) -> int:
+    """Recompute every terminal's counter from the bookings table; returns the terminals corrected"""
+    held = (
+        select(func.count(Booking.id))
+        .where(
+            Booking.terminal_id == Terminal.id,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+            Booking.date >= terminal_today(),
+        )
+        .scalar_subquery()
+    )
+    available = func.greatest(Terminal.max_slots - held, 0)
+    result = await db.execute(
+        update(Terminal)
+        .where(Terminal.available_slots != available)
+        .values(available_slots=available)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def reconcile_all_terminals():
+    async with AsyncSessionLocal() as db:
+        corrected = await reconcile_available_slots(db)
+    if corrected:
+        logger.info("Reconciled available slots of %d terminals", corrected)
+
+
+async def reconcile_available_slots_forever():
+    # The first pass runs at startup, before the app serves requests
+    while True:
+        await asyncio.sleep(settings.SLOT_RECONCILE_INTERVAL_SECONDS)
+        try:
+            await reconcile_all_terminals()
+        except Exception:
+            logger.exception("Reconciling available slots failed")
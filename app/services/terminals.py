@@ -0,0 +1,9 @@
+from ..models.terminal import Terminal
+from ..utils.pagination import RowBundle
+
+
+# Keyset ordering shared by every terminal listing
+TERMINAL_PAGE_ORDER = (Terminal.created_at, Terminal.id)
+
+# Read-only terminal listings load these instead of `Terminal` instances
+TERMINAL_ROW = RowBundle("TerminalRow", *Terminal.__table__.columns)
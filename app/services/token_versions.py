@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import AsyncSessionLocal
+from ..models.token_version import UserTokenVersion
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersionTable:
+    """Per-worker snapshot of `user_token_versions`, reloaded in the background.
+
+    Versions only ever grow, so a reload is merged by keeping the higher value
+    and never undoes a bump recorded locally while the reload was running.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._versions: Dict[UUID, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        """Whether the snapshot is recent enough to authorize requests from token claims"""
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.max_age
+
+    def get(self, user_id: UUID) -> int:
+        return self._versions.get(user_id, 0)
+
+    def set(self, user_id: UUID, version: int):
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    def merge(self, versions: Dict[UUID, int]):
+        with self._lock:
+            for user_id, version in versions.items():
+                if version > self._versions.get(user_id, 0):
+                    self._versions[user_id] = version
+            self._loaded_at = time.monotonic()
+
+
+# A worker whose reloads keep failing stops trusting token claims and falls back
+# to the database after a few missed intervals
+token_versions = TokenVersionTable(max_age=3 * settings.TOKEN_VERSION_REFRESH_SECONDS)
+
+
+def bump_token_version(db: Session, user_id: UUID) -> int:
+    """Stage a version bump that invalidates every access token issued to `user_id`.
+
+    Record the returned version with `invalidate_principal` once the transaction commits.
+    """
+    statement = (
+        insert(UserTokenVersion)
+        .values(user_id=user_id, version=1)
+        .on_conflict_do_update(
+            index_elements=[UserTokenVersion.user_id],
+            set_={"version": UserTokenVersion.version + 1, "updated_at": func.current_timestamp()},
+        )
+        .returning(UserTokenVersion.version)
+    )
+    return db.execute(statement).scalar_one()
+
+
+async def load_token_versions():
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(UserTokenVersion.user_id, UserTokenVersion.version))
+        token_versions.merge({row.user_id: row.version for row in rows})
+
+
+async def refresh_token_versions_forever():
+    while True:
+        await asyncio.sleep(settings.TOKEN_VERSION_REFRESH_SECONDS)
+        try:
+            await load_token_versions()
+        except Exception:
+            logger.exception("Reloading token versions failed")
@@ -1,6 +1,11 @@
 import uuid
+import base64
+import calendar
+import hashlib
+import hmac
+import struct
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 import re
 
 
@@ -34,9 +39,79 @@ def sanitize_input(input_str: str) -> str:
     return input_str
 
 
-def generate_qr_payload(booking_id: str, terminal_id: str, timestamp: datetime) -> str:
-    """Generate a payload for QR codes"""
-    return f"booking:{booking_id}|terminal:{terminal_id}|timestamp:{timestamp.isoformat()}"
+# Signed QR payload: version, booking id, terminal id, driver id (zeros when
+# unbound), valid from/until as UTC epoch seconds, then a truncated HMAC-SHA256.
+# Version 1 packed the epochs unsigned 32-bit, which cannot hold dates before
+# 1970 or after 2106; its payloads are still accepted until they expire.
+_QR_VERSION = 2
+_QR_BODIES = {
+    1: struct.Struct(">B16s16s16sII"),
+    2: struct.Struct(">B16s16s16sqq"),
+}
+_QR_MAC_SIZE = 16
+
+
+class QRPayload(NamedTuple):
+    booking_id: uuid.UUID
+    terminal_id: uuid.UUID
+    driver_id: Optional[uuid.UUID]
+    valid_from: datetime
+    valid_until: datetime
+
+
+def _epoch(dt: datetime) -> int:
+    return calendar.timegm(dt.utctimetuple())
+
+
+def _qr_mac(key: bytes, body: bytes) -> bytes:
+    return hmac.new(key, body, hashlib.sha256).digest()[:_QR_MAC_SIZE]
+
+
+def generate_qr_payload(
+    key: bytes,
+    booking_id,
+    terminal_id,
+    valid_from: datetime,
+    valid_until: datetime,
+    driver_id=None
+) -> str:
+    """Generate a compact signed payload for QR codes, valid between two UTC datetimes"""
+    body = _QR_BODIES[_QR_VERSION].pack(
+        _QR_VERSION,
+        uuid.UUID(str(booking_id)).bytes,
+        uuid.UUID(str(terminal_id)).bytes,
+        uuid.UUID(str(driver_id)).bytes if driver_id else bytes(16),
+        _epoch(valid_from),
+        _epoch(valid_until),
+    )
+    return base64.urlsafe_b64encode(body + _qr_mac(key, body)).rstrip(b"=").decode()
+
+
+def verify_qr_payload(key: bytes, payload: str) -> Optional[QRPayload]:
+    """Decode a payload from `generate_qr_payload`; None when it is malformed or forged"""
+    try:
+        raw = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    except (ValueError, TypeError):
+        return None
+    layout = _QR_BODIES.get(raw[0]) if raw else None
+    if layout is None or len(raw) != layout.size + _QR_MAC_SIZE:
+        return None
+    body, mac = raw[:layout.size], raw[layout.size:]
+    if not hmac.compare_digest(mac, _qr_mac(key, body)):
+        return None
+    _, booking_id, terminal_id, driver_id, valid_from, valid_until = layout.unpack(body)
+    return QRPayload(
+        booking_id=uuid.UUID(bytes=booking_id),
+        terminal_id=uuid.UUID(bytes=terminal_id),
+        driver_id=uuid.UUID(bytes=driver_id) if any(driver_id) else None,
+        valid_from=datetime.utcfromtimestamp(valid_from),
+        valid_until=datetime.utcfromtimestamp(valid_until),
+    )
+
+
+def normalize_plate(plate: str) -> str:
+    """Normalize a truck plate to upper-case letters and digits"""
+    return "".join(ch for ch in plate if ch.isalnum()).upper()
 
 
 def validate_phone_number(phone: str) -> bool:
@@ -0,0 +1,94 @@
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# Add the repository root to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.booking import Booking
+from app.schemas.booking import BookingListResponse
+from app.services.bookings import BOOKING_LIST_COLUMNS, BOOKING_PAGE_ORDER, BOOKING_ROW
+from app.utils.pagination import build_page
+
+
+# One terminal's booking history, inserted and rolled back in the same transaction
+BOOKINGS = 50000
+
+SEED = [
+    """
+    INSERT INTO terminals (id, name, status, max_slots, available_slots, coord_x, coord_y)
+    VALUES (md5('benchmark terminal')::uuid, 'Benchmark', 'ACTIVE', 1000, 1000, 0, 0)
+    """,
+    """
+    INSERT INTO users (id, email, password_hash, role, is_active)
+    VALUES (md5('benchmark carrier')::uuid, 'benchmark-carrier@example.com', '-', 'CARRIER'::userrole, true)
+    """,
+    # Hourly slots from 2000 on, so they overlap nothing already booked
+    f"""
+    INSERT INTO bookings (id, carrier_user_id, terminal_id, date, start_time, end_time, status, qr_payload, created_at, updated_at)
+    SELECT gen_random_uuid(), md5('benchmark carrier')::uuid, md5('benchmark terminal')::uuid,
+           DATE '2000-01-01' + n / 24, make_time(n % 24, 0, 0), make_time(n % 24, 59, 0),
+           'CONSUMED'::bookingstatus, repeat('x', 98), localtimestamp, localtimestamp
+    FROM generate_series(0, {BOOKINGS} - 1) n
+    """,
+]
+
+
+def _load(session: Session, statement, rows_of):
+    session.expunge_all()
+    gc.collect()
+    return rows_of(session.execute(statement))
+
+
+def _measure(session: Session, statement, rows_of):
+    """Load every row of `statement` and validate them as one list page.
+
+    Times are taken on their own run, since tracing allocations slows both steps down.
+    """
+    started = time.perf_counter()
+    rows = _load(session, statement, rows_of)
+    loaded = time.perf_counter() - started
+    started = time.perf_counter()
+    build_page(BookingListResponse, rows, "ok", len(rows), None)
+    validated = time.perf_counter() - started
+    del rows
+
+    tracemalloc.start()
+    rows = _load(session, statement, rows_of)
+    held, _ = tracemalloc.get_traced_memory()
+    build_page(BookingListResponse, rows, "ok", len(rows), None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), held, peak, loaded, validated
+
+
+def main():
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as conn:
+        for statement in SEED:
+            conn.execute(text(statement))
+        session = Session(bind=conn)
+        where = Booking.terminal_id == text("md5('benchmark terminal')::uuid")
+        paths = {
+            "ORM Booking objects": (select(Booking).where(where).order_by(*BOOKING_PAGE_ORDER), lambda result: result.scalars().all()),
+            "Row of the columns": (select(*BOOKING_LIST_COLUMNS).where(where).order_by(*BOOKING_PAGE_ORDER), lambda result: result.all()),
+            "BOOKING_ROW named tuples": (select(BOOKING_ROW).where(where).order_by(*BOOKING_PAGE_ORDER), lambda result: result.scalars().all()),
+        }
+        print(f"{BOOKINGS} bookings at one terminal")
+        for label, (statement, rows_of) in paths.items():
+            count, held, peak, loaded, validated = _measure(session, statement, rows_of)
+            print(
+                f"  {label:<26} {held / count:6.0f} B/row held, {peak / 2**20:6.1f} MiB peak, "
+                f"load {loaded * 1e6 / count:5.1f} us/row, validate {validated * 1e6 / count:5.1f} us/row"
+            )
+        session.close()
+        conn.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the repository root to the path so we can import the app
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import httpx  # Benchmark-only dependency, not in requirements.txt: pip install httpx
+from sqlalchemy import create_engine, text
+from app.core.security import create_access_token
+
+
+# Admins page through a terminal's history while drivers consume their bookings
+HISTORY = 50000
+ADMINS = 2
+DRIVERS = 8
+CONSUMES_PER_DRIVER = 200
+PAGE_SIZE = 500
+PORT = 8765
+
+TERMINAL = "md5('latency benchmark terminal')::uuid"
+ADMIN = "md5('latency benchmark admin')::uuid"
+CARRIER = "md5('latency benchmark carrier')::uuid"
+DRIVER = "md5('latency benchmark driver')::uuid"
+
+SEED = [
+    f"""
+    INSERT INTO terminals (id, name, status, max_slots, available_slots, coord_x, coord_y)
+    VALUES ({TERMINAL}, 'Latency benchmark', 'ACTIVE', 100000, 100000, 0, 0)
+    """,
+    f"""
+    INSERT INTO users (id, email, password_hash, role, is_active) VALUES
+        ({ADMIN}, 'latency-admin@example.com', '-', 'ADMIN'::userrole, true),
+        ({CARRIER}, 'latency-carrier@example.com', '-', 'CARRIER'::userrole, true),
+        ({DRIVER}, 'latency-driver@example.com', '-', 'DRIVER'::userrole, true)
+    """,
+    # Hourly slots from 2000 on, so they overlap nothing already booked
+    f"""
+    INSERT INTO bookings (id, carrier_user_id, terminal_id, date, start_time, end_time, status, qr_payload, created_at, updated_at)
+    SELECT gen_random_uuid(), {CARRIER}, {TERMINAL},
+           DATE '2000-01-01' + n / 24, make_time(n % 24, 0, 0), make_time(n % 24, 59, 0),
+           'CONSUMED'::bookingstatus, repeat('x', 98), localtimestamp, localtimestamp
+    FROM generate_series(0, {HISTORY} - 1) n
+    """,
+    # The bookings the driver consumes, in slots far in the future
+    f"""
+    INSERT INTO bookings (id, carrier_user_id, driver_user_id, terminal_id, date, start_time, end_time, status, created_at, updated_at)
+    SELECT gen_random_uuid(), {CARRIER}, {DRIVER}, {TERMINAL},
+           DATE '2100-01-01' + n / 24, make_time(n % 24, 0, 0), make_time(n % 24, 59, 0),
+           'CONFIRMED'::bookingstatus, localtimestamp, localtimestamp
+    FROM generate_series(0, {DRIVERS * CONSUMES_PER_DRIVER} - 1) n
+    """,
+]
+
+CLEANUP = [
+    f"DELETE FROM bookings WHERE terminal_id = {TERMINAL}",
+    f"DELETE FROM user_token_versions WHERE user_id IN ({ADMIN}, {CARRIER}, {DRIVER})",
+    f"DELETE FROM users WHERE id IN ({ADMIN}, {CARRIER}, {DRIVER})",
+    f"DELETE FROM terminals WHERE id = {TERMINAL}",
+]
+
+RESET = f"""
+UPDATE bookings SET status = 'CONFIRMED' WHERE terminal_id = {TERMINAL} AND date >= DATE '2100-01-01'
+RETURNING id
+"""
+
+
+def serve(mode: str):
+    """Run the app with uvicorn; in `loop` mode the admin listing runs on the event loop, as before"""
+    import uvicorn
+    from app.api.v1.endpoints.admin import get_all_bookings
+    from app.core.database import SyncSessionLocal
+    from app.main import app
+
+    if mode == "loop":
+        # An `async def` handler on the blocking session, which is how the
+        # sync handlers ran before they became plain `def` endpoints
+        @app.get("/benchmark/admin/bookings")
+        async def bookings_on_loop(limit: int = PAGE_SIZE, cursor: str = None):
+            with SyncSessionLocal() as db:
+                return get_all_bookings(
+                    skip=0, limit=limit, cursor=cursor, status=None, date=None,
+                    date_from=None, date_to=None, fields=None, current_user=None, db=db,
+                )
+
+    uvicorn.run(app, port=PORT, log_level="warning")
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _run(mode: str, database_url: str, booking_ids, admin_token: str, driver_token: str, with_admins: bool):
+    # The server must talk to the benchmark database, not the one in .env
+    env = {key: value for key, value in os.environ.items() if key != "ASYNC_DATABASE_URL"}
+    env["DATABASE_URL"] = database_url
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode], cwd=ROOT, env=env)
+    base = f"http://127.0.0.1:{PORT}"
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(base + "/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        listing = "/benchmark/admin/bookings" if mode == "loop" else "/api/v1/admin/bookings"
+        done = threading.Event()
+        pages = []
+
+        def admin():
+            with httpx.Client(base_url=base, headers={"Authorization": f"Bearer {admin_token}"}, timeout=60) as client:
+                cursor = None
+                while not done.is_set():
+                    response = client.get(listing, params={"limit": PAGE_SIZE, **({"cursor": cursor} if cursor else {})})
+                    cursor = response.json().get("next_cursor")
+                    pages.append(1)
+
+        def driver(ids):
+            latencies = []
+            with httpx.Client(base_url=base, headers={"Authorization": f"Bearer {driver_token}"}, timeout=60) as client:
+                for booking_id in ids:
+                    started = time.perf_counter()
+                    response = client.post(f"/api/v1/driver/consume-booking/{booking_id}")
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+            return latencies
+
+        admins = [threading.Thread(target=admin) for _ in range(ADMINS if with_admins else 0)]
+        for thread in admins:
+            thread.start()
+        time.sleep(1 if with_admins else 0)
+        with ThreadPoolExecutor(DRIVERS) as pool:
+            shares = [booking_ids[index::DRIVERS] for index in range(DRIVERS)]
+            latencies = [latency for share in pool.map(driver, shares) for latency in share]
+        done.set()
+        for thread in admins:
+            thread.join()
+        return latencies, len(pages)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(database_url: str):
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        for statement in SEED:
+            conn.execute(text(statement))
+        admin_id, driver_id = conn.execute(text(f"SELECT {ADMIN}, {DRIVER}")).one()
+    admin_token = create_access_token({"sub": str(admin_id)})
+    driver_token = create_access_token({"sub": str(driver_id)})
+    try:
+        print(
+            f"{DRIVERS} drivers x {CONSUMES_PER_DRIVER} consume_booking calls, "
+            f"{ADMINS} admins paging {HISTORY} bookings {PAGE_SIZE} at a time"
+        )
+        for label, mode, with_admins in (
+            ("no admin load", "threads", False),
+            ("admin listing on the event loop (before)", "loop", True),
+            ("admin listing in the worker thread pool (after)", "threads", True),
+        ):
+            with engine.begin() as conn:
+                booking_ids = [str(row.id) for row in conn.execute(text(RESET))]
+            latencies, pages = _run(mode, database_url, booking_ids, admin_token, driver_token, with_admins)
+            print(
+                f"  {label:<48} consume p50 {_percentile(latencies, 0.5) * 1000:7.1f} ms, "
+                f"p99 {_percentile(latencies, 0.99) * 1000:7.1f} ms, max {max(latencies) * 1000:7.1f} ms, "
+                f"{pages} admin pages"
+            )
+    finally:
+        with engine.begin() as conn:
+            for statement in CLEANUP:
+                conn.execute(text(statement))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2])
+    elif sys.argv[1:2] == ["--database-url"] and len(sys.argv) == 3:
+        main(sys.argv[2])
+    else:
+        # Commits ~51k seed rows while it runs, so never default to DATABASE_URL
+        sys.exit("usage: python benchmarks/mixed_latency.py --database-url URL_OF_A_SCRATCH_DATABASE")
@@ -0,0 +1,137 @@
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import date, datetime, time
+
+# Add the repository root to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.models.booking import Booking, BookingStatus
+from app.models.terminal import Terminal, TerminalStatus
+from app.schemas.booking import BookingListResponse
+from app.schemas.terminal import TerminalListResponse
+from app.utils.pagination import build_page
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ROWS = 100  # One admin page
+REPEAT = 200
+
+
+def _bookings():
+    now = datetime.utcnow()
+    return [
+        Booking(
+            id=uuid.uuid4(),
+            carrier_user_id=uuid.uuid4(),
+            driver_user_id=uuid.uuid4() if index % 2 else None,
+            terminal_id=uuid.uuid4(),
+            date=date.today(),
+            start_time=time(8, 0),
+            end_time=time(9, 0),
+            status=BookingStatus.CONFIRMED,
+            decided_by_operator_user_id=uuid.uuid4(),
+            qr_payload="x" * 98,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(ROWS)
+    ]
+
+
+def _terminals():
+    now = datetime.utcnow()
+    return [
+        Terminal(
+            id=uuid.uuid4(),
+            name=f"Terminal {index}",
+            status=TerminalStatus.ACTIVE,
+            max_slots=100,
+            available_slots=50,
+            coord_x=36.7,
+            coord_y=3.0,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(ROWS)
+    ]
+
+
+def _booking_dict(booking):
+    # What admin.get_all_bookings built per row
+    return {
+        "id": str(booking.id),
+        "carrier_user_id": str(booking.carrier_user_id),
+        "driver_user_id": str(booking.driver_user_id) if booking.driver_user_id else None,
+        "terminal_id": str(booking.terminal_id),
+        "date": booking.date,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
+        "status": booking.status.value,
+        "decided_by_operator_user_id": str(booking.decided_by_operator_user_id) if booking.decided_by_operator_user_id else None,
+        "qr_payload": booking.qr_payload,
+        "created_at": booking.created_at,
+        "updated_at": booking.updated_at,
+    }
+
+
+def _terminal_dict(terminal):
+    # What admin/common get_all_terminals built per row
+    return {
+        "id": str(terminal.id),
+        "name": terminal.name,
+        "status": terminal.status.value,
+        "max_slots": terminal.max_slots,
+        "available_slots": terminal.available_slots,
+        "coord_x": terminal.coord_x,
+        "coord_y": terminal.coord_y,
+        "created_at": terminal.created_at,
+        "updated_at": terminal.updated_at,
+    }
+
+
+def _paths(response_model, rows, to_dict):
+    # FastAPI validates the returned value against `response_model`, then dumps it
+    response_field = TypeAdapter(response_model)
+
+    def envelope():
+        return response_model(status="success", message="ok", data=[to_dict(row) for row in rows], limit=ROWS)
+
+    return {
+        # Older FastAPI: dicts, model, jsonable_encoder, stdlib json
+        "dicts + jsonable_encoder + json": lambda: json.dumps(jsonable_encoder(response_field.validate_python(envelope()))).encode(),
+        # Dicts into an orjson default response class, which turns FastAPI's pydantic-core path off
+        **({"dicts + orjson": lambda: orjson.dumps(response_field.dump_python(response_field.validate_python(envelope()), mode="json"))} if orjson else {}),
+        # Dicts, model, then FastAPI's pydantic-core dump
+        "dicts + dump_json": lambda: response_field.dump_json(response_field.validate_python(envelope())),
+        # build_page: attributes validated in one pass, trusted envelope, pydantic-core dump
+        "build_page + dump_json": lambda: response_field.dump_json(
+            response_field.validate_python(build_page(response_model, rows, "ok", ROWS, None))
+        ),
+    }
+
+
+def main():
+    for name, response_model, rows, to_dict in (
+        ("admin bookings", BookingListResponse, _bookings(), _booking_dict),
+        ("terminals", TerminalListResponse, _terminals(), _terminal_dict),
+    ):
+        paths = _paths(response_model, rows, to_dict)
+        outputs = {label: json.loads(path()) for label, path in paths.items()}
+        assert all(output == next(iter(outputs.values())) for output in outputs.values()), "paths disagree"
+        print(f"{name}, {ROWS} rows per page")
+        for label, path in paths.items():
+            seconds = min(timeit.repeat(path, number=REPEAT, repeat=5)) / REPEAT
+            print(f"  {label:<32} {seconds * 1e6 / ROWS:7.2f} us/row")
+
+
+if __name__ == "__main__":
+    main()